@@ -185,6 +185,12 @@ def details():
     )
 
 
+@app.route("/healthz")
+def healthz():
+    """Cheap liveness probe for dependent services."""
+    return {"ok": True}
+
+
 lock = Lock()
 
 
@@ -1,17 +1,25 @@
 # ~/TTS/my_app/audio_server.py
-from fastapi import FastAPI, HTTPException, WebSocket
-from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse, Response
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse, Response, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.background import BackgroundTask
 import os
+import stat as stat_mod
 import asyncio
+import hashlib
+import time
 from pathlib import Path
 import logging
-import json
+import orjson
 import re
 import httpx
+import aiofiles
 from fastapi import Query
 from typing import Optional
+from contextlib import asynccontextmanager
+from my_app.pdf_processor.manifest_files import MANIFEST_FILENAME, MANIFEST_SIDECAR_FILENAME
 
 # ========================================
 # Configuration & Setup
@@ -20,8 +28,6 @@ from typing import Optional
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("AudioServer")
 
-app = FastAPI(title="TTS Audio Server")
-
 APP_DIR = Path(__file__).parent.resolve()
 STATIC_DIR = APP_DIR / "static"
 TEMPLATES_DIR = APP_DIR / "templates"
@@ -30,38 +36,89 @@ OBSIDIAN_DIR = APP_DIR.parent / "obsidian_audio"
 AUDIOBOOKS_DIR = OUTPUT_DIR / "audiobooks"
 PDF_CACHE_DIR = Path("/workspace/pdf_cache")
 
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
-
 AUDIO_SOURCES = {
     "audiobooks": AUDIOBOOKS_DIR,        # /workspace/outputs/audiobooks
     "obsidian": OBSIDIAN_DIR,          # /workspace/obsidian_audio
     "standalone": OUTPUT_DIR           # /workspace/outputs (for non-audiobook files)
 }
+
+# Precompiled sanitizers for user-supplied path components
+_BOOK_ID_RE = re.compile(r'[^\w\s\-]')
+_FILENAME_RE = re.compile(r'[^\w\-\.]')
+
 # Use lowercase default consistent with keys
 DEFAULT_AUDIO_SOURCE_NAME = "audiobooks"
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Upper bound on concurrently open manifest files in list_audiobooks
+MANIFEST_READ_CONCURRENCY = 32
 
-# --- Add client for pdf-service ---
-client = httpx.AsyncClient(timeout=30.0)
+# Parsed manifests keyed by path -> (revision, manifest); re-read only when manifest.json or
+# its manifest.jsonl sidecar changes. The revision is also what the listing/status ETags hash.
+_MANIFEST_CACHE: dict[str, tuple[tuple, dict]] = {}
+MANIFEST_CACHE_MAX_ENTRIES = 256
+
+# Short-lived directory listings so bursts of polls share one scandir: dir -> (monotonic time, entries)
+_LISTING_CACHE: dict[str, tuple[float, list]] = {}
+LISTING_CACHE_TTL = float(os.getenv("LISTING_CACHE_TTL", "1.0"))
+
+# book_id -> manifest path, built at startup and rescanned in the background
+_BOOK_INDEX: dict[str, str] = {}
+BOOK_INDEX_REFRESH_SECONDS = float(os.getenv("BOOK_INDEX_REFRESH_SECONDS", "30"))
+
+# --- pdf-service connection ---
 PDF_SERVICE_URL = "http://pdf-service:8001"
+# Upstream headers forwarded by proxy_serve_pdf (httpx yields header names lowercased)
+_PROXY_HEADER_WHITELIST = frozenset({
+    'content-disposition', 'content-length', 'etag',
+    'accept-ranges', 'last-modified', 'cache-control'
+})
+
+
+def _rebuild_book_index():
+    """Rescan AUDIOBOOKS_DIR and swap in a fresh book_id -> manifest path index."""
+    global _BOOK_INDEX
+    index = {}
+    try:
+        with os.scandir(AUDIOBOOKS_DIR) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    index[entry.name] = os.path.join(entry.path, MANIFEST_FILENAME)
+    except FileNotFoundError:
+        pass
+    _BOOK_INDEX = index
+
+
+async def _refresh_book_index_loop():
+    while True:
+        await asyncio.sleep(BOOK_INDEX_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(_rebuild_book_index)
+        except Exception as e:
+            logger.warning(f"Failed to refresh audiobook index: {e}")
+
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     OBSIDIAN_DIR.mkdir(parents=True, exist_ok=True) # Ensure Obsidian dir exists
     AUDIOBOOKS_DIR.mkdir(parents=True, exist_ok=True)
     STATIC_DIR.mkdir(parents=True, exist_ok=True)
     TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
 
+    # Pooled client for pdf-service; requests use paths relative to PDF_SERVICE_URL
+    app.state.client = httpx.AsyncClient(
+        base_url=PDF_SERVICE_URL,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=200, keepalive_expiry=60.0)
+    )
+
+    _rebuild_book_index()
+    book_index_task = asyncio.create_task(_refresh_book_index_loop())
+    logger.info(f"Indexed {len(_BOOK_INDEX)} audiobooks in {AUDIOBOOKS_DIR}")
+
     try:
-        await client.get(f"{PDF_SERVICE_URL}/docs")
+        response = await app.state.client.head("/healthz")
+        response.raise_for_status()
         logger.info(f"Successfully connected to PDF service at {PDF_SERVICE_URL}")
     except Exception as e:
         logger.error(f"Failed to connect to PDF service at {PDF_SERVICE_URL}: {e}")
@@ -69,10 +126,44 @@ async def startup_event():
     logger.info(f"Serving audio from defined sources: {list(AUDIO_SOURCES.keys())}") # Updated log message
     logger.info("Audio server started successfully.")
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    await client.aclose()
-    logger.info("HTTP client closed.")
+    try:
+        yield
+    finally:
+        book_index_task.cancel()
+        await app.state.client.aclose()
+        logger.info("HTTP client closed.")
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware limited to the JSON API; audio and PDF bodies keep their byte ranges untouched."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not _is_json_api_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+def _is_json_api_path(path: str) -> bool:
+    return (
+        path.startswith("/api/")
+        and not path.startswith(("/api/pdf/", "/api/audio/"))
+        and "/play/" not in path
+    )
+
+
+app = FastAPI(title="TTS Audio Server", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024)
 
 # ========================================
 # Frontend Endpoints
@@ -90,9 +181,46 @@ async def get_player_interface():
 # API Endpoints
 # ========================================
 
+def _cached_scandir(dir_path, ttl: float = LISTING_CACHE_TTL) -> list:
+    """
+    Return the os.DirEntry list for dir_path, reusing a listing younger than ttl seconds.
+    Raises FileNotFoundError if the directory does not exist.
+    """
+    key = str(dir_path)
+    now = time.monotonic()
+    cached = _LISTING_CACHE.get(key)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+    with os.scandir(key) as it:
+        entries = list(it)
+    _LISTING_CACHE[key] = (now, entries)
+    return entries
+
+
+def _make_etag(data: bytes) -> str:
+    return '"' + hashlib.blake2b(data, digest_size=16).hexdigest() + '"'
+
+
+def _etag_response(request: Request, payload: dict, etag: Optional[str] = None) -> Response:
+    """
+    Return payload as JSON with an ETag, or an empty 304 if the client already has it.
+    If no etag is given it is derived from the encoded payload.
+    """
+    body = None
+    if etag is None:
+        body = orjson.dumps(payload)
+        etag = _make_etag(body)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=headers)
+    return ORJSONResponse(payload, headers=headers)
+
+
 # --- Step 1.4: Modified Endpoint to Handle Source Parameter ---
 @app.get("/api/list_audio")
-async def list_audio_files(source: Optional[str] = Query(DEFAULT_AUDIO_SOURCE_NAME)):
+async def list_audio_files(request: Request, source: Optional[str] = Query(DEFAULT_AUDIO_SOURCE_NAME)):
     """Lists audio files from the specified source directory."""
 
     # Validate the source name
@@ -104,22 +232,25 @@ async def list_audio_files(source: Optional[str] = Query(DEFAULT_AUDIO_SOURCE_NA
     logger.info(f"Listing audio files from source '{source}' at path: {target_directory}")
 
     files = []
-    if target_directory.exists():
-        try:
-            # Only get WAV files directly within the target directory
-            for f in target_directory.glob("*.wav"):
-                if f.is_file():
-                    files.append({
-                        "name": f.name,
-                        "path": str(f), # Internal path, might not be needed by frontend
-                        "size_bytes": f.stat().st_size,
-                        "type": source # Return the source type
-                    })
-        except Exception as e:
-            logger.error(f"Error scanning directory {target_directory}: {e}")
-            # Don't raise HTTPException here, just return empty list or partial results
+    try:
+        # Only get WAV files directly within the target directory.
+        # DirEntry.is_file() is answered from the directory read; stat() is cached after the first call.
+        for entry in _cached_scandir(target_directory):
+            if not entry.name.endswith('.wav') or not entry.is_file():
+                continue
+            files.append({
+                "name": entry.name,
+                "path": entry.path, # Internal path, might not be needed by frontend
+                "size_bytes": entry.stat().st_size,
+                "type": source # Return the source type
+            })
+    except FileNotFoundError:
+        pass # Source directory not created yet
+    except Exception as e:
+        logger.error(f"Error scanning directory {target_directory}: {e}")
+        # Don't raise HTTPException here, just return empty list or partial results
 
-    return {"files": files, "source": source} # Also return the source used
+    return _etag_response(request, {"files": files, "source": source}) # Also return the source used
 
 # --- Step 1.5: Modified Endpoint to Handle Source Parameter ---
 
@@ -141,16 +272,26 @@ async def serve_audio_file(filename: str, source: Optional[str] = Query(DEFAULT_
 
     logger.info(f"Request received for file '{filename}' from source '{source}' at path: {file_path}")
 
-    if file_path.exists() and filename.lower().endswith('.wav'):
-        logger.info(f"Serving file: {file_path}")
-        return FileResponse(
-            path=file_path,
-            media_type="audio/wav",
-            headers={"Accept-Ranges": "bytes"}
-        )
+    # Single stat, reused by FileResponse for Content-Length/Last-Modified
+    file_stat = None
+    if filename.lower().endswith('.wav'):
+        try:
+            file_stat = file_path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            pass
 
-    logger.warning(f"File not found: {file_path}")
-    raise HTTPException(status_code=404, detail="Audio file not found in the specified source")
+    # A directory named *.wav would otherwise reach FileResponse and fail mid-response
+    if file_stat is None or not stat_mod.S_ISREG(file_stat.st_mode):
+        logger.warning(f"File not found: {file_path}")
+        raise HTTPException(status_code=404, detail="Audio file not found in the specified source")
+
+    logger.info(f"Serving file: {file_path}")
+    return FileResponse(
+        path=file_path,
+        stat_result=file_stat,
+        media_type="audio/wav",
+        headers={"Accept-Ranges": "bytes"}
+    )
 
 @app.websocket("/stream")
 async def websocket_endpoint(websocket: WebSocket):
@@ -169,16 +310,16 @@ async def websocket_endpoint(websocket: WebSocket):
 
 # --- Replaced direct import with API call ---
 @app.get("/api/audiobook/{book_id}/citation")
-async def get_citation_for_timestamp(book_id: str, timestamp: float = 0.0):
+async def get_citation_for_timestamp(request: Request, book_id: str, timestamp: float = 0.0):
     """
     Get citation information by proxying the request to the pdf-service.
     """
-    safe_book_id = re.sub(r'[^\w\s\-]', '', book_id).strip()
+    safe_book_id = _BOOK_ID_RE.sub('', book_id).strip()
 
     try:
         # Forward the request to the pdf-service
-        api_url = f"{PDF_SERVICE_URL}/api/v1/citation/{safe_book_id}"
-        response = await client.get(api_url, params={"timestamp": timestamp})
+        api_url = f"/api/v1/citation/{safe_book_id}"
+        response = await request.app.state.client.get(api_url, params={"timestamp": timestamp})
 
         # Pass the response (success or error) back to the client
         response.raise_for_status()
@@ -194,54 +335,141 @@ async def get_citation_for_timestamp(book_id: str, timestamp: float = 0.0):
         raise HTTPException(status_code=500, detail="Citation system not available")
 
 
+async def _read_sidecar_entries(sidecar_path: str) -> list:
+    """Ready-chunk entries Stage 3 has appended to manifest.jsonl but not yet compacted."""
+    try:
+        async with aiofiles.open(sidecar_path, 'rb') as f:
+            lines = (await f.read()).splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(orjson.loads(line))
+        except orjson.JSONDecodeError:
+            continue  # Torn final line while Stage 3 is mid-append
+    return entries
+
+
+async def _read_manifest(manifest_path: str) -> tuple[tuple, dict]:
+    """
+    Return (revision, parsed manifest) for manifest_path with the entries from its manifest.jsonl
+    sidecar folded into ready_chunks, served from memory while neither file has changed.
+    Raises FileNotFoundError if the manifest does not exist.
+    """
+    sidecar_path = os.path.join(os.path.dirname(manifest_path), MANIFEST_SIDECAR_FILENAME)
+    mtime_ns = os.stat(manifest_path).st_mtime_ns
+    try:
+        sidecar_stat = os.stat(sidecar_path)
+        revision = (mtime_ns, sidecar_stat.st_mtime_ns, sidecar_stat.st_size)
+    except FileNotFoundError:
+        revision = (mtime_ns, 0, 0)
+    cached = _MANIFEST_CACHE.get(manifest_path)
+    if cached and cached[0] == revision:
+        return cached
+
+    # Sidecar first: Stage 3 replaces manifest.json before truncating the sidecar, so any
+    # entry missing from this sidecar read is already in the manifest read after it
+    sidecar_entries = await _read_sidecar_entries(sidecar_path)
+    async with aiofiles.open(manifest_path, 'rb') as f:
+        manifest = orjson.loads(await f.read())
+
+    if sidecar_entries:
+        ready_chunks = manifest.setdefault('ready_chunks', [])
+        ready_ids = {c['chunk_id'] for c in ready_chunks}
+        for entry in sidecar_entries:
+            if entry['chunk_id'] not in ready_ids:
+                ready_chunks.append(entry)
+                ready_ids.add(entry['chunk_id'])
+        ready_chunks.sort(key=lambda c: c['chunk_id'])
+
+    if manifest_path not in _MANIFEST_CACHE and len(_MANIFEST_CACHE) >= MANIFEST_CACHE_MAX_ENTRIES:
+        # Evict the oldest insertion (dicts preserve insertion order)
+        _MANIFEST_CACHE.pop(next(iter(_MANIFEST_CACHE)))
+    _MANIFEST_CACHE[manifest_path] = (revision, manifest)
+    return revision, manifest
+
+
+async def _load_manifest_summary(book_id: str, book_path: str, sem: asyncio.Semaphore):
+    """Read one audiobook manifest and return (revision, summary), or None if unavailable."""
+    manifest_path = os.path.join(book_path, MANIFEST_FILENAME)
+    async with sem:
+        try:
+            revision, manifest = await _read_manifest(manifest_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read manifest for {book_id}: {e}")
+            return None
+
+    try:
+        total_chunks = manifest.get('total_chunks', 0)
+        ready_chunks = len(manifest.get('ready_chunks', []))
+        return revision, {
+            "book_id": book_id,
+            "title": manifest['metadata'].get('title', book_id),
+            "author": manifest['metadata'].get('author', 'Unknown'),
+            "source_file": manifest['metadata'].get('source_filename', ''),
+            "total_chunks": total_chunks,
+            "ready_chunks": ready_chunks,
+            "is_complete": ready_chunks == total_chunks and total_chunks > 0
+        }
+    except Exception as e:
+        logger.error(f"Failed to read manifest for {book_id}: {e}")
+        return None
+
+
 @app.get("/api/audiobooks")
-async def list_audiobooks():
+async def list_audiobooks(request: Request):
     """Lists all available audiobooks with their processing status"""
-    books = []
-    if not AUDIOBOOKS_DIR.exists():
-        return {"audiobooks": books}
-
-    for book_dir in AUDIOBOOKS_DIR.iterdir():
-        if book_dir.is_dir():
-            manifest_path = book_dir / "manifest.json"
-            if manifest_path.exists():
-                try:
-                    with open(manifest_path, 'r') as f:
-                        manifest = json.load(f)
-                        total_chunks = manifest.get('total_chunks', 0)
-                        ready_chunks = len(manifest.get('ready_chunks', []))
-                        books.append({
-                            "book_id": book_dir.name,
-                            "title": manifest['metadata'].get('title', book_dir.name),
-                            "author": manifest['metadata'].get('author', 'Unknown'),
-                            "source_file": manifest['metadata'].get('source_filename', ''),
-                            "total_chunks": total_chunks,
-                            "ready_chunks": ready_chunks,
-                            "is_complete": ready_chunks == total_chunks and total_chunks > 0
-                        })
-                except Exception as e:
-                    logger.error(f"Failed to read manifest for {book_dir.name}: {e}")
-    return {"audiobooks": books}
+    try:
+        # DirEntry caches the d_type from the directory read, no extra stat()
+        book_dirs = [
+            (entry.name, entry.path) for entry in _cached_scandir(AUDIOBOOKS_DIR)
+            if entry.is_dir(follow_symlinks=False)
+        ]
+    except FileNotFoundError:
+        return _etag_response(request, {"audiobooks": []})
+
+    # Read all manifests concurrently, bounded to avoid fd exhaustion
+    sem = asyncio.Semaphore(MANIFEST_READ_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_load_manifest_summary(name, path, sem) for name, path in book_dirs),
+        return_exceptions=True
+    )
+    results = [r for r in results if isinstance(r, tuple)]
+    books = [summary for _, summary in results]
+
+    # The listing only changes when a manifest or its sidecar is added, removed or rewritten,
+    # so the ETag is derived from (book_id, revision) pairs without hashing the body.
+    etag = _make_etag(repr([(summary["book_id"], revision) for revision, summary in results]).encode())
+    return _etag_response(request, {"audiobooks": books}, etag)
 
 
 @app.get("/api/audiobook/{book_id}/status")
-async def get_audiobook_status(book_id: str):
+async def get_audiobook_status(request: Request, book_id: str):
     """Get detailed status and chunk list for a specific audiobook"""
-    safe_book_id = re.sub(r'[^\w\s\-]', '', book_id).strip()
-    manifest_path = AUDIOBOOKS_DIR / safe_book_id / "manifest.json"
+    safe_book_id = _BOOK_ID_RE.sub('', book_id).strip()
+    manifest_path = _BOOK_INDEX.get(safe_book_id)
+    if manifest_path is None:
+        # Book may have been created since the last index refresh
+        manifest_path = os.path.join(AUDIOBOOKS_DIR, safe_book_id, MANIFEST_FILENAME)
 
-    if not manifest_path.exists():
+    try:
+        revision, manifest = await _read_manifest(manifest_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Audiobook '{book_id}' not found")
+    except Exception as e:
+        logger.error(f"Error reading manifest for {book_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to read audiobook data")
+    _BOOK_INDEX.setdefault(safe_book_id, manifest_path)
 
     try:
-        with open(manifest_path, 'r') as f:
-            manifest = json.load(f)
-
         total_chunks = manifest.get('total_chunks', 1)
         ready_chunks_list = manifest.get('ready_chunks', [])
         progress = (len(ready_chunks_list) / total_chunks) * 100 if total_chunks > 0 else 0
 
-        return {
+        payload = {
             "book_id": safe_book_id,
             "metadata": manifest['metadata'],
             "total_chunks": manifest.get('total_chunks', 0),
@@ -249,47 +477,50 @@ async def get_audiobook_status(book_id: str):
             "progress_percentage": round(progress, 1),
             "is_complete": len(ready_chunks_list) == total_chunks and total_chunks > 0
         }
+        # Payload is fully determined by the book id and the manifest revision
+        etag = _make_etag(f"{safe_book_id}:{revision}".encode())
+        return _etag_response(request, payload, etag)
     except Exception as e:
         logger.error(f"Error reading manifest for {book_id}: {e}")
         raise HTTPException(status_code=500, detail="Failed to read audiobook data")
 
 
 @app.get("/api/pdf/{pdf_filename}")
-async def proxy_serve_pdf(pdf_filename: str):
+async def proxy_serve_pdf(request: Request, pdf_filename: str):
     """
     Proxies request for source PDF document to the pdf-service.
-    FIXED: Uses client.get() for small files to avoid stream closure bugs.
+    Streams the upstream body through in 64KB chunks instead of buffering the whole PDF.
     """
-    safe_filename = re.sub(r'[^\w\-\.]', '', pdf_filename).strip()
+    safe_filename = _FILENAME_RE.sub('', pdf_filename).strip()
 
     if not safe_filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Must be a PDF file")
 
     try:
-        api_url = f"{PDF_SERVICE_URL}/api/v1/document/{safe_filename}"
-        logger.info(f"Proxying PDF request via GET: {api_url}")
+        api_url = f"/api/v1/document/{safe_filename}"
+        logger.info(f"Proxying PDF request via stream: {PDF_SERVICE_URL}{api_url}")
 
-        # --- THE FIX ---
-        # 1. Use client.get() to download the entire file (it's small)
-        response = await client.get(api_url, timeout=30.0)
+        # Send without a context manager so the upstream stays open until the
+        # StreamingResponse has finished; the background task closes it.
+        client = request.app.state.client
+        upstream = await client.send(client.build_request("GET", api_url, timeout=30.0), stream=True)
 
         # Propagate error from pdf-service if it occurs
-        response.raise_for_status()
-
-        # 2. Return a standard Response with the full content
-        return Response(
-            content=response.content,  # Send all content at once
-            status_code=response.status_code,
-            media_type=response.headers.get("content-type", "application/pdf"),
+        if upstream.is_error:
+            await upstream.aread()
+            await upstream.aclose()
+            upstream.raise_for_status()
+
+        return StreamingResponse(
+            upstream.aiter_bytes(65536),
+            status_code=upstream.status_code,
+            media_type=upstream.headers.get("content-type", "application/pdf"),
             headers={
-                k: v for k, v in response.headers.items()
-                if k.lower() in [
-                    'content-disposition', 'content-length', 'etag',
-                    'accept-ranges', 'last-modified', 'cache-control'
-                ]
-            }
+                k: v for k, v in upstream.headers.items()
+                if k in _PROXY_HEADER_WHITELIST
+            },
+            background=BackgroundTask(upstream.aclose)
         )
-        # --- END FIX ---
 
     except httpx.HTTPStatusError as e:
         logger.error(f"Error proxying PDF from pdf-service: {e.response.status_code}")
@@ -305,20 +536,27 @@ async def proxy_serve_pdf(pdf_filename: str):
 @app.get("/api/audiobook/{book_id}/play/{chunk_filename}")
 async def serve_audiobook_chunk(book_id: str, chunk_filename: str):
     """Serve a specific audio chunk from an audiobook"""
-    safe_book_id = re.sub(r'[^\w\s\-]', '', book_id).strip()
-    safe_filename = re.sub(r'[^\w\-\.]', '', chunk_filename).strip()
+    safe_book_id = _BOOK_ID_RE.sub('', book_id).strip()
+    safe_filename = _FILENAME_RE.sub('', chunk_filename).strip()
 
     if not safe_filename.endswith('.wav'):
         raise HTTPException(status_code=400, detail="Only WAV files are supported")
 
     file_path = AUDIOBOOKS_DIR / safe_book_id / safe_filename
 
-    if not file_path.exists():
+    # Single stat, reused by FileResponse for Content-Length/Last-Modified.
+    # NotADirectoryError: safe_book_id names a regular file in AUDIOBOOKS_DIR
+    try:
+        file_stat = file_path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        file_stat = None
+    if file_stat is None or not stat_mod.S_ISREG(file_stat.st_mode):
         logger.warning(f"Audio file not found: {file_path}")
         raise HTTPException(status_code=404, detail="Audio chunk not found")
 
     return FileResponse(
         path=file_path,
+        stat_result=file_stat,
         media_type="audio/wav",
         headers={
             "Accept-Ranges": "bytes",
@@ -332,30 +570,35 @@ async def list_available_pdfs():
     """List PDFs available for processing"""
     pdf_input_dir = Path("/workspace/pdf_input")
     pdfs = []
-    if pdf_input_dir.exists():
-        for pdf_file in pdf_input_dir.glob("*.pdf"):
+    try:
+        for entry in _cached_scandir(pdf_input_dir):
+            if not entry.name.endswith('.pdf') or not entry.is_file():
+                continue
+            size_bytes = entry.stat().st_size
             pdfs.append({
-                "filename": pdf_file.name,
-                "size_bytes": pdf_file.stat().st_size,
-                "size_mb": round(pdf_file.stat().st_size / (1024 * 1024), 2)
+                "filename": entry.name,
+                "size_bytes": size_bytes,
+                "size_mb": round(size_bytes / (1024 * 1024), 2)
             })
+    except FileNotFoundError:
+        pass
     return {"available_pdfs": pdfs}
 
 
 # --- Replaced subprocess with API call ---
 @app.post("/api/process_pdf")
-async def start_pdf_processing(filename: str):
+async def start_pdf_processing(request: Request, filename: str):
     """
     Trigger PDF processing pipeline by proxying the request to pdf-service.
     """
-    safe_filename = re.sub(r'[^\w\-\.]', '', filename).strip()
+    safe_filename = _FILENAME_RE.sub('', filename).strip()
     if not safe_filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Must be a PDF file")
 
     try:
         # Forward the request to the pdf-service
-        api_url = f"{PDF_SERVICE_URL}/api/v1/process/{safe_filename}"
-        response = await client.post(api_url)
+        api_url = f"/api/v1/process/{safe_filename}"
+        response = await request.app.state.client.post(api_url)
 
         # Pass the response (success or error) back to the client
         response.raise_for_status()
@@ -0,0 +1,11 @@
+# ~/TTS/my_app/pdf_processor/manifest_files.py
+"""
+File names of the per-book Stage 3 manifest, shared by the writer (process.py) and the
+reader (audio_server.py). Kept free of service imports so the audio server can use it
+without pulling in the pdf-service app.
+"""
+
+# Compacted manifest, rewritten atomically every MANIFEST_COMPACT_EVERY ready chunks
+MANIFEST_FILENAME = "manifest.json"
+# Ready-chunk entries appended since the last compaction, one JSON object per line
+MANIFEST_SIDECAR_FILENAME = "manifest.jsonl"
@@ -0,0 +1,91 @@
+# ~/TTS/my_app/pdf_processor/page_extract.py
+"""
+Stage 1 page extraction. Lives apart from process.py so the spawned page-pool workers
+only import fitz and this module, not the FastAPI app and its startup work.
+"""
+import fitz  # PyMuPDF
+
+
+def extract_text_blocks_with_coords(text_dict):
+    """
+    Extract reading-order text blocks and span-level bounding boxes from a PDF page.
+
+    Both outputs come from one traversal of PyMuPDF's get_text("dict") result, so the
+    page layout is only parsed once.
+
+    Args:
+        text_dict: Result of page.get_text("dict", sort=True)
+
+    Returns:
+        tuple: (text_blocks, coordinate_blocks) - cleaned block strings and span dicts
+    """
+    text_blocks = []
+    blocks_data = []
+    # Locals for the per-span hot path (millions of spans on large books)
+    add_span = blocks_data.append
+    _round = round
+
+    for block in text_dict["blocks"]:
+        # Skip non-text blocks (images, etc)
+        if block["type"] != 0:
+            continue
+
+        line_texts = []
+        # Process each line in the block
+        for line in block["lines"]:
+            line_spans = []
+            # Process each span (text run with same formatting)
+            for span in line["spans"]:
+                span_text = span["text"]
+                line_spans.append(span_text)
+
+                # Extract bounding box
+                x0, y0, x1, y1 = span["bbox"]
+
+                add_span({
+                    "text": span_text,
+                    "bbox": {
+                        "x": _round(x0, 2),
+                        "y": _round(y0, 2),
+                        "width": _round(x1 - x0, 2),
+                        "height": _round(y1 - y0, 2)
+                    },
+                    "font_size": _round(span["size"], 2),
+                    "font_name": span["font"],
+                    "block_type": "span"  # Granularity level
+                })
+            line_texts.append("".join(line_spans))
+
+        # Same cleanup as the former get_text("blocks") path: rejoin hyphenated
+        # line breaks, then flatten the remaining newlines
+        block_text = ("\n".join(line_texts) + "\n").replace("-\n", "").replace("\n", " ").strip()
+        if block_text:
+            text_blocks.append(block_text)
+
+    return text_blocks, blocks_data
+
+
+def extract_page(doc, page_num: int):
+    """Return (text_blocks, coordinate_blocks) for one page."""
+    page = doc.load_page(page_num)
+    # Single layout parse; yields both the block strings and the span coordinates
+    text_dict = page.get_text("dict", sort=True)
+    return extract_text_blocks_with_coords(text_dict)
+
+
+# Per-worker document handle (fitz.Document is not picklable, so each worker opens its own).
+# The pool outlives a single PDF, so the handle is reopened when a task names another file
+# or revision of it.
+_worker_doc = None
+_worker_doc_key = None
+
+
+def extract_page_in_worker(pdf_path_str: str, mtime_ns: int, page_num: int):
+    global _worker_doc, _worker_doc_key
+    key = (pdf_path_str, mtime_ns)
+    if _worker_doc_key != key:
+        if _worker_doc is not None:
+            _worker_doc.close()
+        _worker_doc = fitz.open(pdf_path_str)
+        _worker_doc_key = key
+    return extract_page(_worker_doc, page_num)
@@ -1,14 +1,30 @@
 # ~/TTS/my_app/pdf_processor/process.py
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 import fitz  # PyMuPDF
+import os
+import stat as stat_mod
 import sys
-import json
+import orjson
 from pathlib import Path
 import logging
 import re  # For sentence splitting
 import asyncio
+import bisect
+import functools
+import io
+import itertools
+from dataclasses import dataclass
+import multiprocessing
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
 import httpx
+import aiofiles
+from operator import itemgetter
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, BackgroundTasks
+from my_app.pdf_processor.manifest_files import MANIFEST_FILENAME, MANIFEST_SIDECAR_FILENAME
+from my_app.pdf_processor.page_extract import extract_page, extract_page_in_worker
 
 # ========================================
 # Configuration & Setup
@@ -26,46 +42,74 @@ CACHE_DIR.mkdir(exist_ok=True)
 INPUT_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# --- Service Setup ---
-app = FastAPI(title="PDF Processing Service")
+# Precompiled sanitizers for user-supplied path components
+_BOOK_ID_RE = re.compile(r'[^\w\s\-]')
+_FILENAME_RE = re.compile(r'[^\w\-\.]')
+
+# Pipeline patterns: book-title sanitization (shared by Stage 1/2 and the cache check) and sentence splitting
+_SANITIZE_RE = re.compile(r'[^\w\s-]')
+_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+# Longest text handed to _SENT_SPLIT_RE in one call; longer blocks are cut on whitespace first
+MAX_SPLIT_SEGMENT_CHARS = 20000
 
-# Create a persistent HTTP client for communicating with tts-service
-# The 'app' logic handles startup/shutdown events
-client = httpx.AsyncClient(timeout=300.0)
+# Sanitized book id -> citation file. Seeded from CACHE_DIR at startup, updated as
+# Stage 2 writes new files, and lazily by the partial-match fallback.
+# Lookups run in worker threads, so mutations go through _CITATION_INDEX_LOCK.
+CITATION_SUFFIX = '_citation_ready.json'
+_CITATION_INDEX: dict[str, Path] = {}
+_CITATION_INDEX_LOCK = threading.Lock()
+
+# --- Service Setup ---
 TTS_SERVICE_URL = "http://tts-service:5002/api/tts"
 # This is the model specified in your docker-compose.base.yml
 TTS_MODEL_NAME = "tts_models/en/ljspeech/tacotron2-DDC"
 
 
-@app.on_event("startup")
-async def startup_event():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Persistent HTTP client for communicating with tts-service, shared via app.state
+    app.state.client = httpx.AsyncClient(timeout=300.0)
+
+    _index_citation_files()
+    logger.info(f"Indexed {len(_CITATION_INDEX)} citation files in {CACHE_DIR}")
+
     # Test connection to TTS service on startup
     try:
-        response = await client.get("http://tts-service:5002/")
+        # HEAD the health endpoint rather than rendering the demo page
+        response = await app.state.client.head("http://tts-service:5002/healthz")
         response.raise_for_status() # Will raise error on 4xx/5xx
         logger.info(f"Successfully connected to TTS service at http://tts-service:5002")
-        # Log snippet of response to confirm it's the demo page (optional)
-        # logger.debug(f"TTS service root response snippet: {response.text[:100]}...")
     except Exception as e:
         logger.error(f"Failed to connect to TTS service at http://tts-service:5002: {e}")
 
+    try:
+        yield
+    finally:
+        await app.state.client.aclose()
+        logger.info("HTTP client closed.")
+        if _PAGE_POOL is not None:
+            _PAGE_POOL.shutdown(cancel_futures=True)
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    await client.aclose()
-    logger.info("HTTP client closed.")
+
+app = FastAPI(title="PDF Processing Service", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 
 # ========================================
 # API Endpoints
 # ========================================
 
+@app.api_route("/healthz", methods=["GET", "HEAD"])
+async def healthz():
+    """Cheap liveness probe used by the audio server on startup."""
+    return {"ok": True}
+
+
 @app.post("/api/v1/process/{pdf_filename}")
 async def start_pdf_processing(pdf_filename: str, background_tasks: BackgroundTasks):
     """
     Triggers the full PDF-to-Audio pipeline in the background.
     """
-    safe_filename = re.sub(r'[^\w\-\.]', '', pdf_filename).strip()
+    safe_filename = _FILENAME_RE.sub('', pdf_filename).strip()
     if not safe_filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Must be a PDF file")
 
@@ -82,30 +126,71 @@ async def start_pdf_processing(pdf_filename: str, background_tasks: BackgroundTa
     return {"status": "processing_started", "filename": safe_filename}
 
 
+def _register_citation_file(citation_path: Path):
+    """Add a citation file to the index under the book id encoded in its name."""
+    name = citation_path.name
+    if name.endswith(CITATION_SUFFIX):
+        with _CITATION_INDEX_LOCK:
+            _CITATION_INDEX[name[:-len(CITATION_SUFFIX)]] = citation_path
+
+
+def _index_citation_files():
+    """Populate the citation index from the files already in CACHE_DIR."""
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(CITATION_SUFFIX):
+                    _register_citation_file(Path(entry.path))
+    except FileNotFoundError:
+        pass
+
+
+def _resolve_citation_path(safe_book_id_sanitized: str):
+    """
+    Find the citation file for a sanitized book id, remembering the result so the
+    directory scan fallback only runs once per book.
+    """
+    cached = _CITATION_INDEX.get(safe_book_id_sanitized)
+    if cached:
+        if cached.exists():
+            return cached
+        # Stale entry (file removed or renamed), resolve again; another thread may have dropped it already
+        with _CITATION_INDEX_LOCK:
+            _CITATION_INDEX.pop(safe_book_id_sanitized, None)
+
+    citation_path = CACHE_DIR / (safe_book_id_sanitized + CITATION_SUFFIX)
+    if not citation_path.exists():
+        # Fallback: scan for partial match
+        citation_path = None
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(CITATION_SUFFIX) and safe_book_id_sanitized in entry.name:
+                    citation_path = Path(entry.path)
+                    break
+        if not citation_path:
+            return None
+
+    with _CITATION_INDEX_LOCK:
+        _CITATION_INDEX[safe_book_id_sanitized] = citation_path
+    return citation_path
+
+
 @app.get("/api/v1/citation/{book_id}")
 async def get_citation(book_id: str, timestamp: float = 0.0):
     """
     Gets citation information for a specific timestamp in an audiobook.
     """
     # CORRECTED: Don't reverse the sanitization
-    safe_book_id = re.sub(r'[^\w\s\-]', '', book_id).strip()
+    safe_book_id = _BOOK_ID_RE.sub('', book_id).strip()
     # Ensure underscores match the Stage 2 output
     safe_book_id_sanitized = safe_book_id.replace(' ', '_')
-    citation_filename = safe_book_id_sanitized + '_citation_ready.json'
-    citation_path = CACHE_DIR / citation_filename
+    # Path resolution and the JSON lookup both hit the disk; keep them off the event loop
+    citation_path = await asyncio.to_thread(_resolve_citation_path, safe_book_id_sanitized)
+    if not citation_path:
+        logger.warning(f"Citation file not found for book_id: {safe_book_id}")
+        raise HTTPException(status_code=404, detail="Citation data not available")
 
-    if not citation_path.exists():
-        # Fallback: scan for partial match
-        found_path = None
-        for f in CACHE_DIR.glob(f"*{safe_book_id_sanitized}*citation_ready.json"):
-            found_path = f
-            break
-        if not found_path:
-            logger.warning(f"Citation file not found for book_id: {safe_book_id}")
-            raise HTTPException(status_code=404, detail="Citation data not available")
-        citation_path = found_path
-
-    citation_data = get_citation_at_timestamp(citation_path, timestamp)
+    citation_data = await asyncio.to_thread(get_citation_at_timestamp, citation_path, timestamp)
     if not citation_data:
         raise HTTPException(status_code=404, detail=f"No citation found for timestamp {timestamp}")
     return citation_data
@@ -116,20 +201,24 @@ async def serve_pdf_document(pdf_filename: str):
     """
     Serves the original source PDF document from the input directory.
     """
-    safe_filename = re.sub(r'[^\w\-\.]', '', pdf_filename).strip()
+    safe_filename = _FILENAME_RE.sub('', pdf_filename).strip()
 
     if not safe_filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Must be a PDF file")
 
     file_path = INPUT_DIR / safe_filename
 
-    # Verify file exists and is actually a file
-    if not file_path.exists() or not file_path.is_file():
+    # Verify file exists and is actually a file (one stat, reused below)
+    try:
+        file_stat = file_path.stat()
+    except FileNotFoundError:
+        file_stat = None
+    if file_stat is None or not stat_mod.S_ISREG(file_stat.st_mode):
         logger.warning(f"Document request failed: File not found at {file_path}")
         raise HTTPException(status_code=404, detail="PDF document not found")
 
     # Optional: Check file size (prevent serving corrupted/huge files)
-    file_size = file_path.stat().st_size
+    file_size = file_stat.st_size
     if file_size > 100 * 1024 * 1024:  # 100MB
         logger.error(f"PDF exceeds size limit: {file_size} bytes")
         raise HTTPException(status_code=413, detail="PDF file too large")
@@ -137,6 +226,7 @@ async def serve_pdf_document(pdf_filename: str):
     logger.info(f"Serving source PDF: {file_path} ({file_size} bytes)")
     return FileResponse(
         path=file_path,
+        stat_result=file_stat,
         media_type="application/pdf",
         headers={
             "Content-Disposition": f"inline; filename=\"{safe_filename}\"",
@@ -150,6 +240,11 @@ async def serve_pdf_document(pdf_filename: str):
 # (These functions are now called by the API, not __main__)
 # ========================================
 
+def _sanitize_book_name(title: str) -> str:
+    """Derive the book id used for citation and audio file names from a title."""
+    return _SANITIZE_RE.sub('', title).strip().replace(' ', '_')
+
+
 # --- Phase 1, Step 2: Add Cache Check ---
 async def run_full_pipeline(pdf_filename: str):
     """
@@ -165,15 +260,24 @@ async def run_full_pipeline(pdf_filename: str):
 
     # Attempt to find citation path early - assumes Stage 1 might have run before
     potential_citation_path = None
+    cache_entries = {}
     try:
+        # One directory read answers both "raw cache?" and "citation cache?" below
+        with os.scandir(CACHE_DIR) as it:
+            cache_entries = {entry.name: entry for entry in it}
+
+        book_name_sanitized = None
         temp_title = pdf_path.stem # Use stem as fallback title
-        if (CACHE_DIR / raw_cache_file_name).exists():
-             with open(CACHE_DIR / raw_cache_file_name, 'r', encoding='utf-8') as f_raw:
-                 raw_data = json.load(f_raw)
-                 temp_title = raw_data['metadata'].get('title', pdf_path.stem)
+        raw_entry = cache_entries.get(raw_cache_file_name)
+        if raw_entry is not None:
+            # One-off probe: Stage 1 rewrites the raw cache if it runs, so don't keep this parse
+            raw_data = _load_json(raw_entry.path, raw_entry.stat().st_mtime_ns, remember=False)
+            book_name_sanitized = raw_data['metadata'].get('book_id')
+            temp_title = raw_data['metadata'].get('title', pdf_path.stem)
 
-        book_name_sanitized = re.sub(r'[^\w\s-]', '', temp_title).strip().replace(' ', '_')
-        potential_citation_path = CACHE_DIR / (book_name_sanitized + '_citation_ready.json')
+        if not book_name_sanitized:  # Raw caches written before book_id was stored
+            book_name_sanitized = _sanitize_book_name(temp_title)
+        potential_citation_path = CACHE_DIR / (book_name_sanitized + CITATION_SUFFIX)
 
     except Exception as e:
         logger.warning(f"Could not determine potential citation path early: {e}")
@@ -181,23 +285,29 @@ async def run_full_pipeline(pdf_filename: str):
 
     # E2's Cache Validation Logic (Option A)
     citation_path = None
-    if potential_citation_path and potential_citation_path.exists():
+    if potential_citation_path and potential_citation_path.name in cache_entries:
         logger.info(f"Citation cache found at {potential_citation_path}, skipping Stage 1 & 2.")
         citation_path = potential_citation_path
     else:
         # Run Stage 1: Process PDF
         logger.info("Citation cache not found or check failed, running Stage 1...")
-        raw_cache_path = process_pdf(pdf_filename) # Uses raw_cache_file_name
+        # Off the event loop: extraction is synchronous and can take a while on big books
+        raw_cache_path = await asyncio.to_thread(_process_pdf_serialized, pdf_filename) # Uses raw_cache_file_name
         if not raw_cache_path:
             logger.error(f"Pipeline HALTED at Stage 1 for: {pdf_filename}")
             return # Stop processing
 
         # Run Stage 2: Prepare Chunks
         logger.info("Running Stage 2...")
-        citation_path = prepare_tts_chunks_with_citations(raw_cache_path)
+        try:
+            citation_path = prepare_tts_chunks_with_citations(raw_cache_path)
+        finally:
+            # Stage 2 is the raw cache's only reader; don't hold the book in memory past it
+            _forget_json(raw_cache_path)
         if not citation_path:
             logger.error(f"Pipeline HALTED at Stage 2 for: {pdf_filename}")
             return # Stop processing
+        _register_citation_file(citation_path)
 
     # Always run Stage 3: Generate Audio (It skips existing files internally)
     if citation_path:
@@ -209,55 +319,133 @@ async def run_full_pipeline(pdf_filename: str):
         logger.error(f"Pipeline HALTED for {pdf_filename} before Stage 3 due to missing citation path.")
 
 
-# ADD THIS NEW HELPER FUNCTION
-# (This is from E2's proposal)
+# --- Pipeline JSON I/O ---
 
-def extract_text_blocks_with_coords(page):
-    """
-    Extract text blocks with bounding box coordinates from a PDF page.
+# Parsed pipeline JSON files, reused while the file's mtime is unchanged:
+# path -> (mtime_ns, size_bytes, data). Entries are shared, so callers must treat them as read-only.
+# Filled from the pipeline and from citation lookups in worker threads, hence the lock.
+# Bounded by the total on-disk size of the cached files, a rough proxy for their parsed size.
+_JSON_CACHE: dict[str, tuple[int, int, dict]] = {}
+_JSON_CACHE_LOCK = threading.Lock()
+_json_cache_bytes = 0
+JSON_CACHE_MAX_BYTES = int(os.getenv("JSON_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
 
-    Uses PyMuPDF's get_text("dict") for structured extraction.
 
-    Args:
-        page: fitz.Page object
+def _remember_json(key: str, mtime_ns: int, size_bytes: int, data: dict):
+    global _json_cache_bytes
+    with _JSON_CACHE_LOCK:
+        old = _JSON_CACHE.pop(key, None)
+        if old:
+            _json_cache_bytes -= old[1]
+        if size_bytes > JSON_CACHE_MAX_BYTES:
+            return
+        while _JSON_CACHE and _json_cache_bytes + size_bytes > JSON_CACHE_MAX_BYTES:
+            # Evict the oldest insertion (dicts preserve insertion order)
+            _json_cache_bytes -= _JSON_CACHE.pop(next(iter(_JSON_CACHE)))[1]
+        _JSON_CACHE[key] = (mtime_ns, size_bytes, data)
+        _json_cache_bytes += size_bytes
 
-    Returns:
-        list: Text blocks with coordinates
-    """
-    blocks_data = []
 
-    # Get structured text data
-    text_dict = page.get_text("dict")
+def _forget_json(path):
+    """Drop a file from _JSON_CACHE once no later stage will read it again."""
+    global _json_cache_bytes
+    with _JSON_CACHE_LOCK:
+        old = _JSON_CACHE.pop(str(path), None)
+        if old:
+            _json_cache_bytes -= old[1]
 
-    for block in text_dict["blocks"]:
-        # Skip non-text blocks (images, etc)
-        if block["type"] != 0:
-            continue
 
-        # Process each line in the block
-        for line in block["lines"]:
-            # Process each span (text run with same formatting)
-            for span in line["spans"]:
-                # Extract bounding box
-                bbox = span["bbox"]  # [x0, y0, x1, y1]
-
-                blocks_data.append({
-                    "text": span["text"],
-                    "bbox": {
-                        "x": round(bbox[0], 2),
-                        "y": round(bbox[1], 2),
-                        "width": round(bbox[2] - bbox[0], 2),
-                        "height": round(bbox[3] - bbox[1], 2)
-                    },
-                    "font_size": round(span["size"], 2),
-                    "font_name": span["font"],
-                    "block_type": "span"  # Granularity level
-                })
+def _load_json(path, mtime_ns: int | None = None, remember: bool = True) -> dict:
+    """
+    Parse a pipeline JSON file with orjson, memoized by (path, mtime). Raises FileNotFoundError.
+    Pass mtime_ns when the caller already has a stat result (e.g. from a scandir entry),
+    and remember=False for one-off reads that should not take up cache space.
+    """
+    key = str(path)
+    if mtime_ns is None:
+        mtime_ns = os.stat(key).st_mtime_ns
+    cached = _JSON_CACHE.get(key)
+    if cached and cached[0] == mtime_ns:
+        return cached[2]
+    with open(key, 'rb') as f:
+        raw = f.read()
+    data = orjson.loads(raw)
+    if remember:
+        _remember_json(key, mtime_ns, len(raw), data)
+    return data
+
+
+def _write_json(path, data: dict, remember: bool = True):
+    """
+    Write a compact pipeline JSON file and prime _load_json so the next stage skips the reparse.
+    Raw caches and citation files are machine-read only; to eyeball one, use
+    `python -m json.tool /workspace/pdf_cache/<name>.json`.
+    """
+    key = str(path)
+    raw = orjson.dumps(data)
+    with open(key, 'wb') as f:
+        f.write(raw)
+    if remember:
+        _remember_json(key, os.stat(key).st_mtime_ns, len(raw), data)
 
-    return blocks_data
 
 # --- Stage 1: Process PDF to Raw JSON ---
-# (This function is unchanged from your original)
+
+# Books with at least this many pages are extracted in a process pool
+PARALLEL_PAGE_THRESHOLD = 16
+PAGE_WORKERS = int(os.getenv("PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Page pool, started on the first large PDF and reused until shutdown so each book
+# doesn't pay for PAGE_WORKERS fresh interpreters
+_PAGE_POOL: ProcessPoolExecutor | None = None
+_PAGE_POOL_LOCK = threading.Lock()
+# Stage 1 runs one book at a time: runs share _DOC_CACHE handles and the page pool
+_STAGE1_LOCK = threading.Lock()
+
+# Open documents reused across Stage 1 runs (and any later per-page reads) of the same
+# PDF: path -> (mtime_ns, fitz.Document). A changed mtime or eviction closes the old handle.
+_DOC_CACHE: dict[str, tuple[int, "fitz.Document"]] = {}
+DOC_CACHE_MAX_ENTRIES = 4
+
+
+def _open_doc(pdf_path) -> "fitz.Document":
+    """
+    Return an open fitz.Document for pdf_path, reusing the cached one while the file is
+    unchanged. Callers must not close it; the cache owns the handle.
+    """
+    key = str(pdf_path)
+    mtime_ns = os.stat(key).st_mtime_ns
+    cached = _DOC_CACHE.get(key)
+    if cached:
+        if cached[0] == mtime_ns and not cached[1].is_closed:
+            return cached[1]
+        _DOC_CACHE.pop(key)[1].close()
+    if len(_DOC_CACHE) >= DOC_CACHE_MAX_ENTRIES:
+        # Evict the oldest insertion (dicts preserve insertion order)
+        _DOC_CACHE.pop(next(iter(_DOC_CACHE)))[1].close()
+    doc = fitz.open(key)
+    _DOC_CACHE[key] = (mtime_ns, doc)
+    return doc
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _PAGE_POOL
+    with _PAGE_POOL_LOCK:
+        if _PAGE_POOL is None:
+            # spawn rather than fork: this runs inside the uvicorn process, which has live threads
+            _PAGE_POOL = ProcessPoolExecutor(
+                max_workers=PAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _PAGE_POOL
+
+
+def _process_pdf_serialized(pdf_filename: str):
+    """process_pdf for worker threads, one Stage 1 run at a time."""
+    with _STAGE1_LOCK:
+        return process_pdf(pdf_filename)
+
+
 def process_pdf(pdf_filename: str):
     pdf_path = INPUT_DIR / pdf_filename
     if not pdf_path.exists():
@@ -268,38 +456,41 @@ def process_pdf(pdf_filename: str):
     logger.info(f"Stage 1: Processing '{pdf_path.name}'...")
     output_data = {"metadata": {}, "content": []}
     try:
-        with fitz.open(pdf_path) as doc:
-            meta = doc.metadata or {}
-            output_data["metadata"] = {
-                "title": meta.get("title", pdf_path.stem),
-                "author": meta.get("author", "Unknown"),
-                "source_filename": pdf_path.name,
-                "total_pages": doc.page_count
-            }
-            for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-
-                # --- OLD (Keep for backward compatibility) ---
-                blocks = page.get_text("blocks", sort=True)
-                page_text_chunks = []
-                for b_index, b in enumerate(blocks):
-                    block_text = b[4].replace("-\n", "").replace("\n", " ").strip()
-                    if block_text:
-                        page_text_chunks.append(block_text)
-
-                # --- NEW (Add coordinate data) ---
-                coordinate_blocks = extract_text_blocks_with_coords(page)
-
-                # --- MODIFIED (Add new key to output) ---
-                if page_text_chunks or coordinate_blocks:
-                    output_data["content"].append({
-                        "page_number": page_num + 1,
-                        "text_blocks": page_text_chunks,  # <-- OLD list of strings
-                        "coordinate_blocks": coordinate_blocks  # <-- NEW list of dicts
-                    })
-
-            with open(cache_file_path, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+        doc = _open_doc(pdf_path)  # Cached handle; not closed here
+        meta = doc.metadata or {}
+        title = meta.get("title", pdf_path.stem)
+        output_data["metadata"] = {
+            "title": title,
+            "author": meta.get("author", "Unknown"),
+            "source_filename": pdf_path.name,
+            "total_pages": doc.page_count,
+            # Sanitized once here; later stages and cache checks reuse it verbatim
+            "book_id": _sanitize_book_name(title)
+        }
+
+        if doc.page_count >= PARALLEL_PAGE_THRESHOLD and PAGE_WORKERS > 1:
+            n = doc.page_count
+            pages = list(_get_page_pool().map(
+                extract_page_in_worker,
+                itertools.repeat(str(pdf_path), n),
+                itertools.repeat(os.stat(pdf_path).st_mtime_ns, n),
+                range(n),
+                chunksize=8
+            ))
+        else:
+            pages = [extract_page(doc, page_num) for page_num in range(doc.page_count)]
+
+        # executor.map preserves input order, so pages are already in page order
+        for page_num, (page_text_chunks, coordinate_blocks) in enumerate(pages):
+            if page_text_chunks or coordinate_blocks:
+                output_data["content"].append({
+                    "page_number": page_num + 1,
+                    "text_blocks": page_text_chunks,  # <-- OLD list of strings
+                    "coordinate_blocks": coordinate_blocks  # <-- NEW list of dicts
+                })
+
+        # Machine-read cache: compact orjson (UTF-8, non-ASCII kept as-is)
+        _write_json(cache_file_path, output_data)
         logger.info(f"Stage 1 complete. Raw text cache saved to: {cache_file_path}")
         return cache_file_path
     except Exception as e:
@@ -308,76 +499,133 @@ def process_pdf(pdf_filename: str):
 
 
 # --- Stage 2: Prepare Citation-Ready Chunks (Hybrid) ---
+
+@functools.lru_cache(maxsize=1024)
+def _split_sentences(block_text: str) -> tuple:
+    """
+    Split a text block into sentences, skipping the regex when the block has no
+    terminator and never feeding it more than MAX_SPLIT_SEGMENT_CHARS at once.
+    Memoized so running headers/footers repeated on every page are split once.
+    """
+    terminators = block_text.count('.') + block_text.count('!') + block_text.count('?')
+    if terminators == 0 or (terminators == 1 and block_text[-1] in '.!?'):
+        # Nothing, or only the final character, to split on: the block is one sentence
+        return (block_text,)
+    if len(block_text) <= MAX_SPLIT_SEGMENT_CHARS:
+        return tuple(_SENT_SPLIT_RE.split(block_text))
+
+    # Pathological block (e.g. OCR output without paragraph breaks): segment on whitespace
+    sentences = []
+    start, n = 0, len(block_text)
+    while start < n:
+        end = start + MAX_SPLIT_SEGMENT_CHARS
+        if end < n:
+            cut = block_text.rfind(' ', start, end)
+            end = cut if cut > start else end
+        sentences.extend(_SENT_SPLIT_RE.split(block_text[start:end]))
+        start = end
+    return tuple(sentences)
+
+# Rows built by the packing loop. orjson serializes slotted dataclasses natively, in field
+# order, so the citation file keeps the same keys as the dicts these replace.
+@dataclass(slots=True)
+class Sentence:
+    global_index: int
+    sentence_in_block: int
+    text: str
+
+
+@dataclass(slots=True)
+class Chunk:
+    chunk_id: int
+    text: str
+    page: int
+    block_index: int
+    sentences: list
+    start_time: float
+    duration_seconds: float
+    end_time: float
+
+
+def _pack_sentences(sentences, max_chars: int, buf: io.StringIO) -> list:
+    """
+    Greedily pack one block's sentences into chunks shorter than max_chars.
+    Returns (chunk_text, chunk_sentences) pairs; a single over-long sentence gets its own chunk.
+    Each sentence is written to buf followed by a space, so buf.tell() is the packed length.
+    """
+    packed = []
+    chunk_sentences = []
+    write, tell = buf.write, buf.tell
+    buf.seek(0)
+    buf.truncate()
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if chunk_sentences and tell() + len(sentence) + 1 >= max_chars:
+            packed.append((buf.getvalue().rstrip(), chunk_sentences))
+            chunk_sentences = []
+            buf.seek(0)
+            buf.truncate()
+        write(sentence)
+        write(' ')
+        chunk_sentences.append(sentence)
+    if chunk_sentences:
+        packed.append((buf.getvalue().rstrip(), chunk_sentences))
+    return packed
+
+
+def _assign_timeline(tts_chunks: list, chars_per_second: int | float) -> float:
+    """
+    Fill in estimated start/duration/end times once packing is done and return the total.
+    Done in one pass after packing instead of while chunks are built; the running sum adds
+    the same durations in the same order, so the times match the old per-chunk values.
+    """
+    durations = [len(chunk.text) / chars_per_second for chunk in tts_chunks]
+    start = 0.0
+    for chunk, duration in zip(tts_chunks, durations):
+        end = start + duration
+        chunk.start_time = start
+        chunk.duration_seconds = duration
+        chunk.end_time = end
+        start = end
+    return start
+
+
 # (This function is unchanged from your original)
 def prepare_tts_chunks_with_citations(cache_file_path: Path, max_chars=400):
     if not cache_file_path or not cache_file_path.exists():
         logger.error(f"Stage 2 Error: Invalid cache file path: {cache_file_path}")
         return None
     logger.info(f"Starting Stage 2 Enhanced: Preparing citation-ready TTS chunks...")
-    with open(cache_file_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = _load_json(cache_file_path)  # Usually still cached from Stage 1's write
     tts_chunks = []
     global_sentence_index = 0
-    estimated_total_time = 0.0
     AVG_CHARS_PER_SECOND = 14
+    buf = io.StringIO()  # Reused by _pack_sentences for every block
     try:
         for page_data in data['content']:
             page_num = page_data['page_number']
             for block_index, block_text in enumerate(page_data['text_blocks']):
-                sentences = re.split(r'(?<=[.!?])\s+', block_text)
-                current_chunk = []
-                current_chunk_chars = 0
-                chunk_sentences_data = []
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if not sentence: continue
-                    sentence_chars = len(sentence) + 1
-                    if current_chunk_chars + sentence_chars < max_chars:
-                        current_chunk.append(sentence)
-                        current_chunk_chars += sentence_chars
-                        chunk_sentences_data.append({
-                            'global_index': global_sentence_index,
-                            'sentence_in_block': len(chunk_sentences_data),
-                            'text': sentence
-                        })
-                        global_sentence_index += 1
-                    else:
-                        if current_chunk:
-                            chunk_text = ' '.join(current_chunk)
-                            est_duration = len(chunk_text) / AVG_CHARS_PER_SECOND
-                            tts_chunks.append({
-                                'chunk_id': len(tts_chunks), 'text': chunk_text,
-                                'page': page_num, 'block_index': block_index + 1,
-                                'sentences': chunk_sentences_data,
-                                'start_time': estimated_total_time,
-                                'duration_seconds': est_duration,
-                                'end_time': estimated_total_time + est_duration
-                            })
-                            estimated_total_time += est_duration
-                        current_chunk = [sentence]
-                        current_chunk_chars = sentence_chars
-                        chunk_sentences_data = [{
-                            'global_index': global_sentence_index,
-                            'sentence_in_block': 0, 'text': sentence
-                        }]
-                        global_sentence_index += 1
-                if current_chunk:
-                    chunk_text = ' '.join(current_chunk)
-                    est_duration = len(chunk_text) / AVG_CHARS_PER_SECOND
-                    tts_chunks.append({
-                        'chunk_id': len(tts_chunks), 'text': chunk_text,
-                        'page': page_num, 'block_index': block_index + 1,
-                        'sentences': chunk_sentences_data,
-                        'start_time': estimated_total_time,
-                        'duration_seconds': est_duration,
-                        'end_time': estimated_total_time + est_duration
-                    })
-                    estimated_total_time += est_duration
+                for chunk_text, chunk_sentences in _pack_sentences(_split_sentences(block_text), max_chars, buf):
+                    sentence_rows = [
+                        Sentence(global_sentence_index + i, i, sentence)
+                        for i, sentence in enumerate(chunk_sentences)
+                    ]
+                    global_sentence_index += len(sentence_rows)
+                    tts_chunks.append(Chunk(
+                        len(tts_chunks), chunk_text, page_num, block_index + 1,
+                        sentence_rows, 0.0, 0.0, 0.0))
+
+        estimated_total_time = _assign_timeline(tts_chunks, AVG_CHARS_PER_SECOND)
 
         # --- REFACTOR ---
-        # The book ID must be derived from the title for the citation API to find it
-        book_title = data['metadata'].get('title', cache_file_path.stem.replace("_raw", ""))
-        book_name_sanitized = re.sub(r'[^\w\s-]', '', book_title).strip().replace(' ', '_')
+        # The book ID must be derived from the title for the citation API to find it;
+        # Stage 1 stores it, older raw caches fall back to sanitizing the title here
+        book_name_sanitized = data['metadata'].get('book_id')
+        if not book_name_sanitized:
+            book_title = data['metadata'].get('title', cache_file_path.stem.replace("_raw", ""))
+            book_name_sanitized = _sanitize_book_name(book_title)
         # Use the sanitized name for the citation file
         citation_file_name = book_name_sanitized + '_citation_ready.json'
         citation_path = CACHE_DIR / citation_file_name
@@ -392,8 +640,8 @@ def prepare_tts_chunks_with_citations(cache_file_path: Path, max_chars=400):
             },
             'chunks': tts_chunks
         }
-        with open(citation_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2)
+        # Not primed into _JSON_CACHE: readers expect plain dicts, not Chunk/Sentence rows
+        _write_json(citation_path, output_data, remember=False)
         logger.info(f"Stage 2 complete. Citation-ready chunks saved to: {citation_path}")
         return citation_path
     except Exception as e:
@@ -403,23 +651,134 @@ def prepare_tts_chunks_with_citations(cache_file_path: Path, max_chars=400):
 
 # --- Stage 3: Generate Audio (Refactored to use API) ---
 
+# ready_chunks entries are appended to manifest.jsonl as they are produced and
+# folded into manifest.json every MANIFEST_COMPACT_EVERY chunks and on exit,
+# instead of rewriting the whole manifest after every chunk. The audio server reads both
+# files, so progress is visible per chunk.
+MANIFEST_COMPACT_EVERY = int(os.getenv("MANIFEST_COMPACT_EVERY", "50"))
+# Number of TTS requests Stage 3 keeps in flight at once
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+# Opt-in: send runs of short adjacent same-page chunks as one TTS request and split the WAV
+# back per chunk. Boundaries follow each chunk's share of the text, so they are approximate.
+TTS_BATCH_SHORT_CHUNKS = os.getenv("TTS_BATCH_SHORT_CHUNKS", "0") == "1"
+TTS_BATCH_MAX_CHARS = int(os.getenv("TTS_BATCH_MAX_CHARS", "350"))
+TTS_BATCH_MAX_CHUNKS = int(os.getenv("TTS_BATCH_MAX_CHUNKS", "4"))
+
+
+def _chunk_audio_filename(chunk: dict) -> str:
+    return f"chunk_{chunk['chunk_id']:04d}_p{chunk['page']}.wav"
+
+
+def _group_chunks_for_tts(chunks: list) -> list:
+    """
+    Group consecutive same-page chunks whose joined text stays under TTS_BATCH_MAX_CHARS
+    (at most TTS_BATCH_MAX_CHUNKS per group). Every chunk is its own group unless
+    TTS_BATCH_SHORT_CHUNKS is enabled.
+    """
+    if not TTS_BATCH_SHORT_CHUNKS:
+        return [[chunk] for chunk in chunks]
+    groups = []
+    group_chars = 0
+    for chunk in chunks:
+        chunk_chars = len(chunk['text']) + 1
+        if groups:
+            group = groups[-1]
+            prev = group[-1]
+            if (len(group) < TTS_BATCH_MAX_CHUNKS
+                    and prev['page'] == chunk['page']
+                    and prev['chunk_id'] + 1 == chunk['chunk_id']
+                    and group_chars + chunk_chars < TTS_BATCH_MAX_CHARS):
+                group.append(chunk)
+                group_chars += chunk_chars
+                continue
+        groups.append([chunk])
+        group_chars = chunk_chars
+    return groups
+
+
+def _split_batched_wav(batch_path: Path, out_paths: list, weights: list):
+    """
+    Split one WAV into consecutive WAVs, one per out_path, with frame counts proportional
+    to weights. Each output is written to a .part file and renamed into place.
+    """
+    try:
+        with wave.open(str(batch_path), 'rb') as src:
+            params = src.getparams()
+            total_frames = src.getnframes()
+            total_weight = sum(weights) or 1
+            frame_pos = 0
+            for i, (out_path, cum_weight) in enumerate(zip(out_paths, itertools.accumulate(weights))):
+                end_frame = total_frames if i == len(out_paths) - 1 else round(total_frames * cum_weight / total_weight)
+                part_path = out_path.with_name(out_path.name + ".part")
+                try:
+                    with wave.open(str(part_path), 'wb') as dst:
+                        dst.setparams(params)
+                        dst.writeframes(src.readframes(end_frame - frame_pos))
+                    os.replace(part_path, out_path)
+                except BaseException:
+                    part_path.unlink(missing_ok=True)
+                    raise
+                frame_pos = end_frame
+    finally:
+        batch_path.unlink(missing_ok=True)
+
+
+def _add_ready_chunk(manifest: dict, ready_ids: set, chunk: dict, audio_filename: str) -> dict:
+    """Record a generated chunk in the manifest, keeping ready_chunks ordered by chunk_id."""
+    entry = {
+        "chunk_id": chunk['chunk_id'],
+        "filename": audio_filename,
+        "page": chunk['page'],
+        "text_snippet": chunk['text'][:50] + "...",
+        "start_time": chunk['start_time'],
+        "duration_seconds": chunk['duration_seconds']
+    }
+    bisect.insort(manifest['ready_chunks'], entry, key=itemgetter('chunk_id'))
+    ready_ids.add(chunk['chunk_id'])
+    return entry
+
+
+def _write_manifest(manifest_path: Path, manifest: dict):
+    """Write manifest.json atomically so readers never see a partial file."""
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    # Kept indented: manifest.json is the one file humans inspect
+    with open(tmp_path, 'wb') as f:
+        f.write(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_path, manifest_path)
+
+
+def _merge_manifest_sidecar(sidecar_path: Path, manifest: dict, ready_ids: set):
+    """Fold ready-chunk entries left in the sidecar by an interrupted run into the manifest."""
+    if not sidecar_path.exists():
+        return
+    with open(sidecar_path, 'r') as f:
+        for line in f:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # Torn final line from a crash mid-write
+            if entry['chunk_id'] not in ready_ids:
+                bisect.insort(manifest['ready_chunks'], entry, key=itemgetter('chunk_id'))
+                ready_ids.add(entry['chunk_id'])
+
+
 async def generate_audio_streaming(citation_json_path: Path, limit=None):
     """
-    Stage 3 Streaming: Generate audio chunks one at a time via API, updating a manifest.
+    Stage 3 Streaming: Generate audio chunks via API (up to TTS_CONCURRENCY at once), updating a manifest.
     """
     if not citation_json_path.exists():
         logger.error(f"Stage 3 Error: Citation file not found: {citation_json_path}")
         return None
 
-    with open(citation_json_path, 'r') as f:
-        data = json.load(f)
+    data = _load_json(citation_json_path)
 
     # Use the pre-sanitized book_id from the citation file
     book_name = data.get('book_id', citation_json_path.stem.replace('_citation_ready', ''))
     audio_dir = OUTPUT_DIR / book_name
     audio_dir.mkdir(parents=True, exist_ok=True)
 
-    manifest_path = audio_dir / "manifest.json"
+    manifest_path = audio_dir / MANIFEST_FILENAME
+    sidecar_path = audio_dir / MANIFEST_SIDECAR_FILENAME
     manifest = {
         "metadata": data['metadata'],
         "book_id": book_name,
@@ -427,127 +786,234 @@ async def generate_audio_streaming(citation_json_path: Path, limit=None):
         "ready_chunks": []
     }
 
-    # Pre-populate ready_chunks from existing manifest if it exists
-    if manifest_path.exists():
-        try:
-            with open(manifest_path, 'r') as f:
-                existing_manifest = json.load(f)
+    # Pre-populate ready_chunks from existing manifest (and any uncompacted sidecar) if present
+    try:
+        if manifest_path.exists():
+            with open(manifest_path, 'rb') as f:
+                existing_manifest = orjson.loads(f.read())
                 # Safely get ready_chunks, defaulting to empty list if key missing
                 manifest['ready_chunks'] = existing_manifest.get('ready_chunks', [])
-        except Exception as e:
-            # E2 Fix: Log error and HALT on read failure to prevent overwrite
-            logger.error(f"CRITICAL: Failed to read existing manifest at {manifest_path}: {e}")
-            logger.error(
-                "Halting audio generation for this book to prevent data loss. Fix manifest file manually or delete it to restart.")
-            return None  # Stop processing this book
+        # O(1) membership instead of scanning ready_chunks for every chunk
+        ready_ids = {c['chunk_id'] for c in manifest['ready_chunks']}
+        _merge_manifest_sidecar(sidecar_path, manifest, ready_ids)
+    except Exception as e:
+        # E2 Fix: Log error and HALT on read failure to prevent overwrite
+        logger.error(f"CRITICAL: Failed to read existing manifest at {manifest_path}: {e}")
+        logger.error(
+            "Halting audio generation for this book to prevent data loss. Fix manifest file manually or delete it to restart.")
+        return None  # Stop processing this book
 
     chunks_to_process = data['chunks'][:limit] if limit else data['chunks']
     logger.info(f"Stage 3: Generating audio for {len(chunks_to_process)} chunks...")
 
-    for chunk in chunks_to_process:
-        chunk_id = chunk['chunk_id']
-        page = chunk['page']
-        audio_filename = f"chunk_{chunk_id:04d}_p{page}.wav"
-        audio_path = audio_dir / audio_filename
-
-        if audio_path.exists() or any(c['chunk_id'] == chunk_id for c in manifest['ready_chunks']):
-            logger.info(f"Skipping chunk {chunk_id} (already exists or in manifest).")
-            # Ensure it IS in the manifest if the file exists but wasn't listed before
-            if audio_path.exists() and not any(c['chunk_id'] == chunk_id for c in manifest['ready_chunks']):
-                logger.warning(f"Chunk {chunk_id} file exists but was missing from manifest. Adding it now.")
-                manifest['ready_chunks'].append({
-                    "chunk_id": chunk_id,
-                    "filename": audio_filename,
-                    "page": page,
-                    "text_snippet": chunk['text'][:50] + "...",
-                    "start_time": chunk['start_time'],
-                    "duration_seconds": chunk['duration_seconds']
-                })
-                manifest['ready_chunks'].sort(key=lambda c: c['chunk_id'])
-                # Re-save manifest immediately to fix inconsistency
-                try:
-                    with open(manifest_path, 'w') as f_fix:
-                        json.dump(manifest, f_fix, indent=2)
-                except Exception as e_fix:
-                    logger.error(f"Failed to update manifest for skipped chunk {chunk_id}: {e_fix}")
-            continue  # Skip TTS generation
-
-        # --- REFACTOR: Replaced subprocess with API call ---
-        try:
-            logger.info(f"Generating chunk {chunk_id}/{len(chunks_to_process)} via API...")
-
-            # This is the standard API payload for the Coqui TTS server
-            params = {
-                "text": chunk['text'],
-                "speaker_id": "",  # Use speaker_id as per Coqui server.py/demo JS
-                "style_wav": "",  # Use style_wav as per Coqui server.py/demo JS
-                "language_id": "",  # Use language_id as per Coqui server.py/demo JS
-            }
-
-            # Make the POST request, sending data in URL params, not JSON body
-            response = await client.post(TTS_SERVICE_URL, params=params, timeout=300.0)
-            # --- END CORRECTION ---
+    pending = 0  # Entries in the sidecar not yet folded into manifest.json
+
+    loop = asyncio.get_running_loop()
+
+    async def compact():
+        # The indented manifest dump + write runs in the default executor so it doesn't
+        # stall in-flight downloads. Callers hold manifest_lock (or run before dispatch),
+        # so nothing mutates the manifest while the worker thread serializes it.
+        nonlocal pending
+        await loop.run_in_executor(None, _write_manifest, manifest_path, manifest)
+        sidecar.seek(0)
+        sidecar.truncate()
+        pending = 0
+
+    async def record_ready(chunk, audio_filename):
+        nonlocal pending
+        entry = _add_ready_chunk(manifest, ready_ids, chunk, audio_filename)
+        # One short line per chunk; cheap enough to append on the loop
+        sidecar.write(orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))
+        sidecar.flush()
+        pending += 1
+        if pending >= MANIFEST_COMPACT_EVERY:
+            await compact()
+
+    # One listing instead of an exists() per chunk; files written during this run are
+    # tracked through ready_ids instead
+    existing_audio = set(os.listdir(audio_dir))
+
+    # Up to TTS_CONCURRENCY requests in flight; manifest/sidecar updates are serialized
+    sem = asyncio.Semaphore(TTS_CONCURRENCY)
+    manifest_lock = asyncio.Lock()
+
+    # Requests finish out of order, but ready_chunks must stay a gap-free prefix for the
+    # player. Each slot (a group to synthesize, or a chunk already on disk) parks its result
+    # here and the manifest only advances over the contiguous run of finished slots.
+    finished = {}  # slot index -> [(chunk, audio_filename), ...]; empty if generation failed
+    next_slot = 0
+
+    async def finish_slot(slot, ready):
+        nonlocal next_slot
+        async with manifest_lock:
+            finished[slot] = ready
+            while next_slot in finished:
+                for chunk, audio_filename in finished.pop(next_slot):
+                    await record_ready(chunk, audio_filename)
+                next_slot += 1
+
+    async def synthesize(text, part_path):
+        """POST one TTS request and stream the WAV body into part_path."""
+        # This is the standard API payload for the Coqui TTS server
+        params = {
+            "text": text,
+            "speaker_id": "",  # Use speaker_id as per Coqui server.py/demo JS
+            "style_wav": "",  # Use style_wav as per Coqui server.py/demo JS
+            "language_id": "",  # Use language_id as per Coqui server.py/demo JS
+        }
 
+        # Make the POST request, sending data in URL params, not JSON body.
+        # The body is streamed to a .part file so a failed download never
+        # leaves a truncated WAV that later runs would treat as done.
+        async with app.state.client.stream("POST", TTS_SERVICE_URL, params=params, timeout=300.0) as response:
+            if response.is_error:
+                await response.aread()  # Make the error body available to the handler below
             response.raise_for_status()  # Will raise error if (4xx or 5xx)
 
-            # Save the raw audio content
-            with open(audio_path, 'wb') as f:
-                f.write(response.content)
-
-        except httpx.HTTPStatusError as e:
-            logger.error(
-                f"Failed chunk {chunk_id}: HTTP Error {e.response.status_code} from TTS service. {e.response.text}")
-            continue  # Skip to next chunk
-        except Exception as e:
-            logger.error(f"Failed chunk {chunk_id}: {e}")
-            continue  # Skip to next chunk
-        # --- End Refactor ---
-
-        # IMMEDIATELY update manifest when chunk is ready
-        manifest['ready_chunks'].append({
-            "chunk_id": chunk_id,
-            "filename": audio_filename,
-            "page": page,
-            "text_snippet": chunk['text'][:50] + "...",
-            "start_time": chunk['start_time'],
-            "duration_seconds": chunk['duration_seconds']
-        })
-        manifest['ready_chunks'].sort(key=lambda c: c['chunk_id'])
-
-        with open(manifest_path, 'w') as f:
-            json.dump(manifest, f, indent=2)
-
-        logger.info(f"Chunk {chunk_id} marked as ready in manifest.")
+            # Save the raw audio content as it arrives
+            async with aiofiles.open(part_path, 'wb') as f:
+                async for buf in response.aiter_bytes(65536):
+                    await f.write(buf)
+
+    async def process_group(group) -> list:
+        """Synthesize one group and return its (chunk, audio_filename) pairs, or [] on failure."""
+        audio_filenames = [_chunk_audio_filename(chunk) for chunk in group]
+        first_id = group[0]['chunk_id']
+        label = f"chunk {first_id}" if len(group) == 1 else f"chunks {first_id}-{group[-1]['chunk_id']}"
+
+        async with sem:
+            # --- REFACTOR: Replaced subprocess with API call ---
+            part_path = audio_dir / (audio_filenames[0] + (".part" if len(group) == 1 else ".batch.part"))
+            try:
+                logger.info(f"Generating {label}/{len(chunks_to_process)} via API...")
+                await synthesize(' '.join(chunk['text'] for chunk in group), part_path)
+                if len(group) == 1:
+                    os.replace(part_path, audio_dir / audio_filenames[0])
+                else:
+                    await asyncio.to_thread(
+                        _split_batched_wav, part_path,
+                        [audio_dir / name for name in audio_filenames],
+                        [len(chunk['text']) for chunk in group])
+
+            except httpx.HTTPStatusError as e:
+                logger.error(
+                    f"Failed {label}: HTTP Error {e.response.status_code} from TTS service. {e.response.text}")
+                part_path.unlink(missing_ok=True)
+                return []  # Skip to next chunk
+            except Exception as e:
+                logger.error(f"Failed {label}: {e}")
+                part_path.unlink(missing_ok=True)
+                return []  # Skip to next chunk
+            # --- End Refactor ---
+
+        logger.info(f"{label.capitalize()} generated.")
+        return list(zip(group, audio_filenames))
+
+    async def run_slot(slot, group, on_disk):
+        # Record the chunks as ready (sidecar append, periodic compaction) as soon as every
+        # earlier slot has finished; a failed or crashed group must still release its slot
+        ready = [(chunk, _chunk_audio_filename(chunk)) for chunk in group] if on_disk else []
+        try:
+            if not on_disk:
+                ready = await process_group(group)
+        finally:
+            await finish_slot(slot, ready)
+
+    with open(sidecar_path, 'ab') as sidecar:
+        # Publish whatever was recovered from a previous run before generating more
+        await compact()
+        try:
+            # Skip chunks that are already done and lay out the rest as slots in chunk order
+            slots = []  # (group, on_disk)
+            chunks_to_generate = []
+            for chunk in chunks_to_process:
+                chunk_id = chunk['chunk_id']
+                audio_filename = _chunk_audio_filename(chunk)
+                audio_exists = audio_filename in existing_audio
+                if audio_exists or chunk_id in ready_ids:
+                    logger.info(f"Skipping chunk {chunk_id} (already exists or in manifest).")
+                    # Ensure it IS in the manifest if the file exists but wasn't listed before
+                    if audio_exists and chunk_id not in ready_ids:
+                        logger.warning(f"Chunk {chunk_id} file exists but was missing from manifest. Adding it now.")
+                        slots.extend((group, False) for group in _group_chunks_for_tts(chunks_to_generate))
+                        chunks_to_generate = []
+                        slots.append(([chunk], True))
+                    continue  # Skip TTS generation
+                chunks_to_generate.append(chunk)
+            slots.extend((group, False) for group in _group_chunks_for_tts(chunks_to_generate))
+
+            results = await asyncio.gather(
+                *(run_slot(slot, group, on_disk) for slot, (group, on_disk) in enumerate(slots)),
+                return_exceptions=True
+            )
+            for (group, _), result in zip(slots, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed chunk {group[0]['chunk_id']}: {result}")
+        finally:
+            if pending:
+                async with manifest_lock:
+                    await compact()
 
     logger.info(f"Stage 3 complete. Audio generation finished. Files saved to: {audio_dir}")
     return audio_dir
 
 
 # --- Citation Lookup Function (For API) ---
+
+# path -> (mtime_ns, (start_times, chunks, data)). Keyed by path alone so a rewritten
+# citation file replaces its old timeline instead of sitting next to it.
+_TIMELINE_CACHE: dict[str, tuple[int, tuple]] = {}
+_TIMELINE_CACHE_LOCK = threading.Lock()
+TIMELINE_CACHE_MAX_ENTRIES = 32
+
+
+def _load_citation_timeline(path_str: str, mtime_ns: int):
+    """
+    Parse a citation file once per (path, mtime) into (start_times, chunks, data).
+    Chunks are written in playback order, so start_times is already sorted.
+    """
+    cached = _TIMELINE_CACHE.get(path_str)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    data = _load_json(path_str, mtime_ns)
+    chunks = data['chunks']
+    timeline = ([chunk['start_time'] for chunk in chunks], chunks, data)
+    with _TIMELINE_CACHE_LOCK:
+        _TIMELINE_CACHE.pop(path_str, None)
+        if len(_TIMELINE_CACHE) >= TIMELINE_CACHE_MAX_ENTRIES:
+            # Evict the oldest insertion (dicts preserve insertion order)
+            _TIMELINE_CACHE.pop(next(iter(_TIMELINE_CACHE)), None)
+        _TIMELINE_CACHE[path_str] = (mtime_ns, timeline)
+    return timeline
+
+
 def get_citation_at_timestamp(citation_json_path: Path, timestamp_seconds: float):
-    if not citation_json_path.exists():
+    try:
+        mtime_ns = os.stat(citation_json_path).st_mtime_ns
+    except FileNotFoundError:
         logger.error(f"Citation file not found: {citation_json_path}")
         return None
-    with open(citation_json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    for chunk in data['chunks']:
-        if chunk['start_time'] <= timestamp_seconds < chunk['end_time']:
-            time_into_chunk = timestamp_seconds - chunk['start_time']
-            progress_ratio = time_into_chunk / chunk['duration_seconds'] if chunk['duration_seconds'] > 0 else 0
-            sentence_index = int(progress_ratio * len(chunk['sentences']))
-            sentence_index = min(sentence_index, len(chunk['sentences']) - 1)
-            sentence = chunk['sentences'][sentence_index]
-            metadata = data['metadata']
-            return {
-                'citation': (
-                    f"{metadata.get('author', 'Unknown')} - {metadata.get('title', 'Unknown Title')}, "
-                    f"p.{chunk['page']}, ¶{chunk['block_index']}, sent.{sentence['sentence_in_block'] + 1}"
-                ),
-                'timestamp': f"{int(timestamp_seconds // 60)}:{int(timestamp_seconds % 60):02d}",
-                'page': chunk['page'],
-                'block': chunk['block_index'],
-                'sentence_in_block': sentence['sentence_in_block'] + 1,
-                'sentence_text': sentence['text'][:100] + "..." if len(sentence['text']) > 100 else sentence['text'],
-            }
-    logger.warning(f"No chunk found for timestamp: {timestamp_seconds}")
-    return None
\ No newline at end of file
+    start_times, chunks, data = _load_citation_timeline(str(citation_json_path), mtime_ns)
+    idx = bisect.bisect_right(start_times, timestamp_seconds) - 1
+    if idx < 0 or timestamp_seconds >= chunks[idx]['end_time']:
+        logger.warning(f"No chunk found for timestamp: {timestamp_seconds}")
+        return None
+    chunk = chunks[idx]
+    time_into_chunk = timestamp_seconds - chunk['start_time']
+    progress_ratio = time_into_chunk / chunk['duration_seconds'] if chunk['duration_seconds'] > 0 else 0
+    sentence_index = int(progress_ratio * len(chunk['sentences']))
+    sentence_index = min(sentence_index, len(chunk['sentences']) - 1)
+    sentence = chunk['sentences'][sentence_index]
+    metadata = data['metadata']
+    return {
+        'citation': (
+            f"{metadata.get('author', 'Unknown')} - {metadata.get('title', 'Unknown Title')}, "
+            f"p.{chunk['page']}, ¶{chunk['block_index']}, sent.{sentence['sentence_in_block'] + 1}"
+        ),
+        'timestamp': f"{int(timestamp_seconds // 60)}:{int(timestamp_seconds % 60):02d}",
+        'page': chunk['page'],
+        'block': chunk['block_index'],
+        'sentence_in_block': sentence['sentence_in_block'] + 1,
+        'sentence_text': sentence['text'][:100] + "..." if len(sentence['text']) > 100 else sentence['text'],
+    }
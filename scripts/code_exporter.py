@@ -1,17 +1,46 @@
 # code_exporter_full.py (FINAL, v1.8)
 import os
+import io
+import sys
+import time
 import re
+import codecs
 import json
 import fnmatch
 import traceback
 import random
 import string
 from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from operator import itemgetter
 from typing import Set, Dict, List, Optional
 
+try:  # Optional: faster config parsing; the stdlib json module is used otherwise
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _compile_combined(patterns: List[str]) -> Optional[re.Pattern]:
+    """Compile glob patterns into one case-insensitive alternation (None for an empty list)"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns), re.IGNORECASE)
+
 
 class CodeProjectExporter:
+    # Path separators and characters invalid in Windows filenames, all mapped to '_' in one pass
+    _SANITIZE_TABLE = str.maketrans(dict.fromkeys('<>:"|?*' + os.sep + ('/' if os.sep != '/' else ''), '_'))
+    # Bound on memoized basename matches; the cache is simply cleared when full
+    _MATCH_CACHE_MAX_ENTRIES = 8192
+    # Include patterns the extension fast path understands: "*.ext" and literal "Prefix*"
+    _EXT_PATTERN_RE = re.compile(r'^\*\.[A-Za-z0-9]+$')
+    _PREFIX_PATTERN_RE = re.compile(r'^[A-Za-z0-9_.\-]+\*$')
+    # Output buffer size: a typical export/index file then reaches disk in a single write
+    _WRITE_BUFFER_SIZE = 1 << 20
+
     def __init__(self, config_path="export_config.json"):
         self.config_path = config_path
 
@@ -21,27 +50,32 @@ class CodeProjectExporter:
         self.global_skip_dirs: Set[str] = set()
         self.global_exclude_patterns: List[str] = []
         self.max_file_size: int = 0
+        self.skip_hidden: bool = False
 
         self.load_config()
 
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + ''.join(
             random.choices(string.ascii_lowercase + string.digits, k=8))
         self.exported_files: List[Dict] = []
+        self._tree_root: Dict = {}  # Nested dirs -> files (None leaves) for the last collected project
 
-        self._global_compiled_patterns = [
-            re.compile(fnmatch.translate(pattern), re.IGNORECASE)
-            for pattern in self.global_include_patterns
-        ]
-        self._global_compiled_exclude_patterns = [
-            re.compile(fnmatch.translate(pattern), re.IGNORECASE)
-            for pattern in self.global_exclude_patterns
-        ]
+        self._pattern_cache: Dict[tuple, Optional[re.Pattern]] = {}
+        # basename -> include-and-not-excluded, valid for the current project's patterns only
+        self._match_cache: Dict[str, bool] = {}
+        self._exclude_first: bool = False
+        self._ext_fastpath: Optional[tuple] = None
+        self._global_include_re = self._compile_patterns(self.global_include_patterns)
+        self._global_exclude_re = self._compile_patterns(self.global_exclude_patterns)
 
     def load_config(self):
         """Load configuration from JSON file"""
         try:
-            with open(self.config_path, 'r') as f:
-                config = json.load(f)
+            if orjson is not None:
+                with open(self.config_path, 'rb') as f:
+                    config = orjson.loads(f.read())
+            else:
+                with open(self.config_path, 'r') as f:
+                    config = json.load(f)
 
             self.obsidian_base = Path(config.get("export_base"))
             self.projects = config.get("projects", [])
@@ -49,6 +83,7 @@ class CodeProjectExporter:
             self.global_skip_dirs = set(config.get("global_skip_dirs", []))
             self.global_exclude_patterns = config.get("global_exclude_patterns", [])
             self.max_file_size = config.get("max_file_size_mb", 5) * 1024 * 1024
+            self.skip_hidden = config.get("skip_hidden", False)
 
             if not self.obsidian_base or not self.projects:
                 raise KeyError("Config missing 'export_base' or 'projects'")
@@ -69,121 +104,205 @@ class CodeProjectExporter:
         summary_path = self.obsidian_base / f"EXPORT_SUMMARY_{self.timestamp}.md"
 
         try:
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                f.write(f"# Code Export Summary\n\n")
-                f.write(f"**Timestamp**: {self.timestamp}\n")
-                f.write(f"**Total Projects**: {len(results)}\n\n")
-
-                f.write("## Export Results\n\n")
-                for result in results:
-                    status = "✓" if result['success'] else "✗"
-                    f.write(f"- {status} **{result['name']}**\n")
-                    f.write(f"  - Source: `{result['path']}`\n")
-                    if result['output']:
-                        link_path = f"{result['output'].name}/00_PROJECT_INDEX"
-                        f.write(f"  - Output: [[{link_path}|{result['name']} Project Index]]\n")
-                    else:
-                        f.write(f"  - Output: Failed to export (No files found or error)\n")
-                    f.write("\n")
-
-                # --- v1.8 New Section ---
-                f.write("---\n")
-                f.write("## Aggregated Project File Trees\n\n")
-                for result in results:
-                    if result['success']:
-                        f.write(f"### {result['name']}\n\n")
-                        f.write("```\n")
-                        f.write(result['tree_content'])
-                        f.write("\n```\n\n")
+            parts = [
+                f"# Code Export Summary\n\n",
+                f"**Timestamp**: {self.timestamp}\n",
+                f"**Total Projects**: {len(results)}\n\n",
+                "## Export Results\n\n",
+            ]
+            for result in results:
+                status = "✓" if result['success'] else "✗"
+                parts.append(f"- {status} **{result['name']}**\n")
+                parts.append(f"  - Source: `{result['path']}`\n")
+                if result['output']:
+                    link_path = f"{result['output'].name}/00_PROJECT_INDEX"
+                    parts.append(f"  - Output: [[{link_path}|{result['name']} Project Index]]\n")
+                else:
+                    parts.append(f"  - Output: Failed to export (No files found or error)\n")
+                parts.append("\n")
+
+            # --- v1.8 New Section ---
+            parts.append("---\n")
+            parts.append("## Aggregated Project File Trees\n\n")
+            for result in results:
+                if result['success']:
+                    parts.append(f"### {result['name']}\n\n```\n{result['tree_content']}\n```\n\n")
+
+            with open(summary_path, 'w', encoding='utf-8', buffering=self._WRITE_BUFFER_SIZE) as f:
+                f.write("".join(parts))
 
             print(f"\nSummary saved to: {summary_path}")
         except Exception as e:
             print(f"Could not create summary: {e}")
 
     def collect_matching_files(self, root_path: Path,
-                               patterns: List[re.Pattern],
+                               include_re: Optional[re.Pattern],
                                skip_dirs_set: Set[str],
-                               exclude_patterns: List[re.Pattern]):
+                               exclude_re: Optional[re.Pattern]):
         """Recursively collect all files matching provided patterns"""
         print(f"Scanning {root_path}...")
         self.exported_files = []
+        self._tree_root = {}  # Filled in alongside exported_files
+        self._match_cache = {}  # Patterns may differ per project
         file_count = 0
+        # Progress only on an interactive terminal, redrawn at most every 250 ms
+        show_progress = sys.stdout.isatty()
+        last_progress = 0.0
+        # file_info paths are plain strings; Path objects are only built where a file is exported
+        root_prefix_len = len(os.path.join(os.fspath(root_path), ''))
 
-        for item in root_path.rglob('*'):
+        for entry in self._scandir_recursive(root_path, skip_dirs_set):
             file_count += 1
-            if file_count % 500 == 0:
-                print(f"  ...scanned {file_count} items".ljust(50), end='\r')
+            if show_progress and (now := time.monotonic()) - last_progress > 0.25:
+                sys.stdout.write(f"  ...scanned {file_count} items".ljust(50) + '\r')
+                sys.stdout.flush()
+                last_progress = now
+
+            # Cheap reject before any stat or regex work: the name's extension/prefix cannot
+            # match any include pattern (only enabled when all patterns are of those shapes)
+            if self._ext_fastpath is not None:
+                exts, prefixes = self._ext_fastpath
+                lower_name = entry.name.lower()
+                dot = lower_name.rfind('.')
+                if (dot == -1 or lower_name[dot:] not in exts) and not lower_name.startswith(prefixes):
+                    continue
 
-            if item.is_symlink():
-                continue
+            try:
+                # DirEntry caches the stat result; it is carried into file_info so the
+                # export step never stats the file again
+                st = entry.stat()
+                file_size = st.st_size
+                if file_size > self.max_file_size:
+                    print(f"  Skipping large file ({file_size / 1024 / 1024:.1f}MB): {entry.name}")
+                    continue
 
-            if any(part == skip_dir for part in item.parts for skip_dir in skip_dirs_set):
+                if self._is_wanted(entry.name, include_re, exclude_re):
+                    relative_path = entry.path[root_prefix_len:]
+                    self.exported_files.append({
+                        'full_path': entry.path,
+                        'relative_path': relative_path,
+                        'rel_dir': os.path.dirname(relative_path),  # '' for files at the root
+                        'name': entry.name,
+                        'sort_key': relative_path.lower(),
+                        'size': file_size,
+                        'mtime': st.st_mtime
+                    })
+
+                    parts = relative_path.split(os.sep)
+                    node = self._tree_root
+                    for part in parts[:-1]:
+                        node = node.setdefault(part, {})
+                    node[parts[-1]] = None
+            except (OSError, PermissionError) as e:
+                print(f"  Cannot access {entry.name}: {e}")
                 continue
 
-            if item.is_file():
-                try:
-                    if item.stat().st_size > self.max_file_size:
-                        print(f"  Skipping large file ({item.stat().st_size / 1024 / 1024:.1f}MB): {item.name}")
-                        continue
-
-                    if self._matches_patterns(item.name, patterns):
-                        if self._matches_patterns(item.name, exclude_patterns):
-                            continue  # File is explicitly excluded
-
-                        self.exported_files.append({
-                            'full_path': item,
-                            'relative_path': item.relative_to(root_path)
-                        })
-                except (OSError, PermissionError) as e:
-                    print(f"  Cannot access {item.name}: {e}")
-                    continue
-
         print(f"\nScan complete. Found {len(self.exported_files)} matching files.".ljust(50))
 
-    def _matches_patterns(self, filename: str, patterns: List[re.Pattern]) -> bool:
-        """Check if filename matches any of the provided patterns"""
-        return any(pattern.match(filename) for pattern in patterns)
-
-    def _render_tree(self, tree_dict: Dict, root_name: str, prefix: str = "") -> str:
-        """Render tree dictionary as string"""
-        lines = []
-        if not prefix:
-            lines.append(f"{root_name}/")
-
-        items = sorted(tree_dict.items(), key=lambda x: (x[1] is None, x[0].lower()))
+    def _scandir_recursive(self, root_path: Path, skip_dirs_set: Set[str]):
+        """Yield os.DirEntry objects for every regular file under root_path (symlinks are not followed).
+        Entries named in skip_dirs_set (and dot-entries when skip_hidden is set) are pruned, never descended into."""
+        stack = [root_path]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        name = entry.name
+                        if name in skip_dirs_set or (self.skip_hidden and name.startswith('.')):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                yield entry
+                        except OSError as e:
+                            print(f"  Cannot access {entry.name}: {e}")
+            except OSError as e:
+                print(f"  Cannot scan {current}: {e}")
+
+    def _compile_patterns(self, patterns: List[str]) -> Optional[re.Pattern]:
+        """Combined regex for a pattern list, shared by every project using the same list"""
+        key = tuple(patterns)
+        if key not in self._pattern_cache:
+            self._pattern_cache[key] = _compile_combined(patterns)
+        return self._pattern_cache[key]
+
+    def _is_wanted(self, filename: str, include_re: Optional[re.Pattern],
+                   exclude_re: Optional[re.Pattern]) -> bool:
+        """Included and not explicitly excluded, memoized per basename (__init__.py, index.js, ...)"""
+        wanted = self._match_cache.get(filename)
+        if wanted is None:
+            if self._exclude_first:
+                wanted = (not self._matches_patterns(filename, exclude_re)
+                          and self._matches_patterns(filename, include_re))
+            else:
+                wanted = (self._matches_patterns(filename, include_re)
+                          and not self._matches_patterns(filename, exclude_re))
+            if len(self._match_cache) >= self._MATCH_CACHE_MAX_ENTRIES:
+                self._match_cache.clear()
+            self._match_cache[filename] = wanted
+        return wanted
+
+    @classmethod
+    def _build_ext_fastpath(cls, include_patterns: List[str]) -> Optional[tuple]:
+        """(lowercase extensions, lowercase name prefixes) when every include pattern is "*.ext"
+        or "Prefix*"; None if any other pattern is present and the fast path must stay off"""
+        exts = set()
+        prefixes = []
+        for pattern in include_patterns:
+            if cls._EXT_PATTERN_RE.match(pattern):
+                exts.add(pattern[1:].lower())
+            elif cls._PREFIX_PATTERN_RE.match(pattern):
+                prefixes.append(pattern[:-1].lower())
+            else:
+                return None
+        return frozenset(exts), tuple(prefixes)
+
+    @staticmethod
+    def _should_exclude_first(include_patterns: List[str], exclude_patterns: List[str]) -> bool:
+        """Test the exclude regex first when it is much smaller than a large include list"""
+        return bool(exclude_patterns) and len(exclude_patterns) < len(include_patterns) / 4
+
+    def _matches_patterns(self, filename: str, regex: Optional[re.Pattern]) -> bool:
+        """Check if filename matches the combined pattern regex (an empty pattern list matches nothing)"""
+        return regex is not None and regex.match(filename) is not None
+
+    def _render_tree(self, tree_dict: Dict, root_name: str) -> str:
+        """Render tree dictionary as string (iterative pre-order walk; directories before files)"""
+        def sorted_children(subtree):
+            items = sorted(subtree.items(), key=lambda x: (x[1] is None, x[0].lower()))
+            last = len(items) - 1
+            return ((i == last, name, child) for i, (name, child) in enumerate(items))
+
+        out = [f"{root_name}/"]
+        stack = [(sorted_children(tree_dict), "")]
+        while stack:
+            children, prefix = stack[-1]
+            item = next(children, None)
+            if item is None:
+                stack.pop()
+                continue
 
-        for i, (name, subtree) in enumerate(items):
-            is_last = (i == len(items) - 1)
+            is_last, name, subtree = item
             connector = "└── " if is_last else "├── "
-
             if subtree is None:
-                lines.append(f"{prefix}{connector}{name}")
+                out.append(f"{prefix}{connector}{name}")
             else:
-                lines.append(f"{prefix}{connector}{name}/")
+                out.append(f"{prefix}{connector}{name}/")
                 extension = "    " if is_last else "│   "
-                subtree_lines = self._render_tree(subtree, name, prefix + extension)
-                lines.extend(subtree_lines.splitlines())
+                stack.append((sorted_children(subtree), prefix + extension))
 
-        return "\n".join(filter(None, lines))
+        return "\n".join(out)
 
-    def export_file_with_context(self, file_path, relative_path, output_dir):
-        """Export a single file maintaining directory context"""
+    def export_file_with_context(self, file_path, relative_path, output_dir, file_size, file_mtime):
+        """Export a single file maintaining directory context (size/mtime come from the collection scan)"""
         source_file = Path(file_path)
 
-        try:
-            file_stat = source_file.stat()
-            if file_stat.st_size > self.max_file_size:
-                print(f"  Skipping large file during export: {relative_path}")
-                return
-            file_size_str = f"{file_stat.st_size:,} bytes"
-            file_mod_time = datetime.fromtimestamp(file_stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-
-        except (OSError, PermissionError) as e:
-            print(f"  Cannot access {file_path} during export: {e}")
-            return
+        file_size_str = f"{file_size:,} bytes"
+        file_mod_time = datetime.fromtimestamp(file_mtime).strftime('%Y-%m-%d %H:%M:%S')
 
-        safe_name = str(relative_path).replace(os.sep, '_')
-        safe_name = re.sub(r'[<>:"|?*]', '_', safe_name)
+        safe_name = relative_path.translate(self._SANITIZE_TABLE)
 
         if len(safe_name) > 200:
             safe_name = safe_name[:197] + "..."
@@ -192,8 +311,7 @@ class CodeProjectExporter:
         output_path = output_dir / md_filename
 
         try:
-            with open(source_file, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            src = open(source_file, 'rb')
         except Exception as e:
             print(f"Warning: Could not read {file_path}: {e}")
             return
@@ -210,15 +328,23 @@ class CodeProjectExporter:
         else:
             language = lang_map.get(ext, 'text')
 
+        # Stream the body in 64 KB pieces; the decoder pair reproduces text-mode reading
+        # (errors='replace', universal newlines) without holding the whole file in memory
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(errors='replace'), translate=True)
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(f"# {relative_path}\n\n")
-                f.write(f"**Full Path**: `{source_file}`\n")
-                f.write(f"**Size**: {file_size_str}\n")
-                f.write(f"**Modified**: {file_mod_time}\n\n")
-                f.write("---\n\n")
-                f.write(f"```{language}\n")
-                f.write(content)
+            with src, open(output_path, 'w', encoding='utf-8', buffering=self._WRITE_BUFFER_SIZE) as f:
+                f.write(
+                    f"# {relative_path}\n\n"
+                    f"**Full Path**: `{source_file}`\n"
+                    f"**Size**: {file_size_str}\n"
+                    f"**Modified**: {file_mod_time}\n\n"
+                    "---\n\n"
+                    f"```{language}\n"
+                )
+                while chunk := src.read(65536):
+                    f.write(decoder.decode(chunk))
+                f.write(decoder.decode(b'', final=True))
                 f.write("\n```\n")
         except Exception as e:
             print(f"Error writing {output_path}: {e}")
@@ -229,69 +355,78 @@ class CodeProjectExporter:
             print("No projects defined in config.")
             return
 
-        results = []
-        for project in self.projects:
-            print(f"\n{'=' * 60}")
-            print(f"Exporting: {project.get('name', 'Unknown')}")
-            print(f"{'=' * 60}")
-
-            # --- Select Patterns ---
-            project_patterns = project.get("include_patterns")
-            if project_patterns:
-                print(f"  Using per-project include patterns...")
-                compiled_patterns = [
-                    re.compile(fnmatch.translate(p), re.IGNORECASE)
-                    for p in project_patterns
-                ]
-            else:
-                print(f"  Using global include patterns...")
-                compiled_patterns = self._global_compiled_patterns
-
-            # --- Select Skip Dirs ---
-            project_skip_dirs = project.get("skip_dirs")
-            if project_skip_dirs is not None:
-                print(f"  Using per-project skip dirs...")
-                skip_dirs_set = set(project_skip_dirs)
-            else:
-                print(f"  Using global skip dirs...")
-                skip_dirs_set = self.global_skip_dirs
-
-            # --- Select Exclude Patterns ---
-            project_exclude_patterns = project.get("exclude_patterns")
-            if project_exclude_patterns:
-                print(f"  Using per-project exclude patterns...")
-                compiled_exclude_patterns = [
-                    re.compile(fnmatch.translate(p), re.IGNORECASE)
-                    for p in project_exclude_patterns
-                ]
-            else:
-                print(f"  Using global exclude patterns...")
-                compiled_exclude_patterns = self._global_compiled_exclude_patterns
-
-            result = self.export_directory(
-                project.get('path'),
-                project.get('name'),
-                compiled_patterns,
-                skip_dirs_set,
-                compiled_exclude_patterns
-            )
-
-            # --- v1.8 Change ---
-            results.append({
-                'name': project.get('name'),
-                'path': project.get('path'),
-                'output': result.get("output_dir") if result else None,
-                'tree_content': result.get("tree_content") if result else "No files found or error.",
-                'success': result is not None
-            })
+        # Projects are independent subtrees with their own output dirs. Each pool worker
+        # runs _export_project on its own (pickled) copy of this exporter.
+        if len(self.projects) == 1:
+            results = [self._export_project(self.projects[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=min(len(self.projects), os.cpu_count() or 1)) as executor:
+                results = list(executor.map(self._export_project, self.projects))
 
         self.create_export_summary(results)
         return results
 
+    def _export_project(self, project: Dict) -> Dict:
+        """Export one configured project and return its summary entry"""
+        print(f"\n{'=' * 60}")
+        print(f"Exporting: {project.get('name', 'Unknown')}")
+        print(f"{'=' * 60}")
+
+        # --- Select Patterns ---
+        project_patterns = project.get("include_patterns")
+        if project_patterns:
+            print(f"  Using per-project include patterns...")
+            include_re = self._compile_patterns(project_patterns)
+        else:
+            print(f"  Using global include patterns...")
+            include_re = self._global_include_re
+
+        # --- Select Skip Dirs ---
+        project_skip_dirs = project.get("skip_dirs")
+        if project_skip_dirs is not None:
+            print(f"  Using per-project skip dirs...")
+            skip_dirs_set = set(project_skip_dirs)
+        else:
+            print(f"  Using global skip dirs...")
+            skip_dirs_set = self.global_skip_dirs
+
+        # --- Select Exclude Patterns ---
+        project_exclude_patterns = project.get("exclude_patterns")
+        if project_exclude_patterns:
+            print(f"  Using per-project exclude patterns...")
+            exclude_re = self._compile_patterns(project_exclude_patterns)
+        else:
+            print(f"  Using global exclude patterns...")
+            exclude_re = self._global_exclude_re
+
+        self._ext_fastpath = self._build_ext_fastpath(project_patterns or self.global_include_patterns)
+
+        # Only the evaluation order in _is_wanted changes; the result is the same either way
+        self._exclude_first = self._should_exclude_first(
+            project_patterns or self.global_include_patterns,
+            project_exclude_patterns or self.global_exclude_patterns)
+
+        result = self.export_directory(
+            project.get('path'),
+            project.get('name'),
+            include_re,
+            skip_dirs_set,
+            exclude_re
+        )
+
+        # --- v1.8 Change ---
+        return {
+            'name': project.get('name'),
+            'path': project.get('path'),
+            'output': result.get("output_dir") if result else None,
+            'tree_content': result.get("tree_content") if result else "No files found or error.",
+            'success': result is not None
+        }
+
     def export_directory(self, source_dir: str, project_name: str,
-                         patterns: List[re.Pattern],
+                         include_re: Optional[re.Pattern],
                          skip_dirs_set: Set[str],
-                         exclude_patterns: List[re.Pattern]):
+                         exclude_re: Optional[re.Pattern]):
         """Export entire directory structure to Obsidian"""
         if not source_dir:
             print("Error: Project path is empty in config.")
@@ -314,7 +449,7 @@ class CodeProjectExporter:
             print(f"Error creating output directory: {e}")
             return None
 
-        self.collect_matching_files(source_path, patterns, skip_dirs_set, exclude_patterns)
+        self.collect_matching_files(source_path, include_re, skip_dirs_set, exclude_re)
 
         if not self.exported_files:
             print("  No matching files found. Aborting export for this project.")
@@ -324,24 +459,33 @@ class CodeProjectExporter:
                 print(f"Warning: Could not remove empty dir {output_dir}: {e}")
             return None
 
-        self.exported_files.sort(key=lambda x: str(x['relative_path']).lower())
+        self.exported_files.sort(key=itemgetter('sort_key'))
 
         tree_content = self.generate_filtered_tree(source_path)
 
         self.write_index_file(output_dir, project_name, source_path, tree_content)
         self.create_directory_structure(source_path, output_dir)
 
+        # File export is I/O-bound (the GIL is released during reads/writes), so threads overlap it
         exported_count = 0
-        for file_info in self.exported_files:
-            try:
-                self.export_file_with_context(
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 4)) as executor:
+            futures = {
+                executor.submit(
+                    self.export_file_with_context,
                     file_info['full_path'],
                     file_info['relative_path'],
-                    output_dir
-                )
-                exported_count += 1
-            except Exception as e:
-                print(f"Error exporting {file_info['relative_path']}: {e}")
+                    output_dir,
+                    file_info['size'],
+                    file_info['mtime']
+                ): file_info
+                for file_info in self.exported_files
+            }
+            for future in as_completed(futures):
+                e = future.exception()
+                if e is None:
+                    exported_count += 1
+                else:
+                    print(f"Error exporting {futures[future]['relative_path']}: {e}")
 
         print(f"✓ Exported {exported_count}/{len(self.exported_files)} files to: {output_dir}")
 
@@ -353,83 +497,65 @@ class CodeProjectExporter:
 
     def generate_filtered_tree(self, root_path) -> str:
         """Generate tree showing only matched files and their parent directories"""
-        tree_dict = self._build_tree_dict()
-        return self._render_tree(tree_dict, root_path.name)
-
-    def _build_tree_dict(self) -> Dict:
-        """Build nested dictionary structure from the file list"""
-        tree = {}
-
-        for file_info in self.exported_files:
-            parts = file_info['relative_path'].parts
-            current = tree
-
-            for i, part in enumerate(parts):
-                if i == len(parts) - 1:
-                    current[part] = None
-                else:
-                    if part not in current:
-                        current[part] = {}
-                    current = current[part]
-        return tree
+        return self._render_tree(self._tree_root, root_path.name)
 
     def write_index_file(self, output_dir, project_name, source_path, tree_content):
         """Write the main index file"""
         index_path = output_dir / "00_PROJECT_INDEX.md"
         try:
-            with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(f"# {project_name} Export\n\n")
-                f.write(f"**Source**: `{source_path}`\n")
-                f.write(f"**Exported**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"**Total Files**: {len(self.exported_files)}\n")
-                f.write(f"**Max File Size**: {self.max_file_size / 1024 / 1024:.1f}MB\n\n")
-                f.write("## Project Structure (Filtered)\n\n")
-                f.write("```\n")
-                f.write(tree_content)
-                f.write("\n```\n\n")
-                f.write("## Exported Files\n\n")
-
-                current_dir = None
-                for file_info in self.exported_files:
-                    rel_path = file_info['relative_path']
-                    file_dir = rel_path.parent
-
-                    if file_dir != current_dir:
-                        current_dir = file_dir
-                        f.write(f"\n### {file_dir if str(file_dir) != '.' else 'Root'}\n\n")
-
-                    safe_link = str(rel_path).replace(os.sep, '_')
-                    f.write(f"- [[{safe_link}.md|{rel_path.name}]]\n")
+            parts = [
+                f"# {project_name} Export\n\n",
+                f"**Source**: `{source_path}`\n",
+                f"**Exported**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+                f"**Total Files**: {len(self.exported_files)}\n",
+                f"**Max File Size**: {self.max_file_size / 1024 / 1024:.1f}MB\n\n",
+                "## Project Structure (Filtered)\n\n",
+                f"```\n{tree_content}\n```\n\n",
+                "## Exported Files\n\n",
+            ]
+
+            current_dir = None
+            for file_info in self.exported_files:
+                file_dir = file_info['rel_dir']
+
+                if file_dir != current_dir:
+                    current_dir = file_dir
+                    parts.append(f"\n### {file_dir or 'Root'}\n\n")
+
+                safe_link = file_info['relative_path'].replace(os.sep, '_')
+                parts.append(f"- [[{safe_link}.md|{file_info['name']}]]\n")
+
+            with open(index_path, 'w', encoding='utf-8', buffering=self._WRITE_BUFFER_SIZE) as f:
+                f.write("".join(parts))
         except Exception as e:
             print(f"Error writing index file: {e}")
             traceback.print_exc()
 
     def create_directory_structure(self, source_path, output_dir):
         """Create directory README stubs to preserve structure in Obsidian"""
-        dirs_created = set()
-
+        # Group once (insertion order keeps the sorted file order) instead of rescanning per directory
+        by_dir = defaultdict(list)
         for file_info in self.exported_files:
-            rel_path = file_info['relative_path']
-            dir_path = rel_path.parent
-
-            if str(dir_path) != '.' and dir_path not in dirs_created:
-                readme_name = f"_DIR_{str(dir_path).replace(os.sep, '_')}_README.md"
-                readme_path = output_dir / readme_name
-
-                try:
-                    with open(readme_path, 'w', encoding='utf-8') as f:
-                        f.write(f"# Directory: {dir_path}\n\n")
-                        f.write(f"This directory contains files from `{source_path / dir_path}`\n\n")
-                        f.write("## Files in this directory\n\n")
-
-                        for fi in self.exported_files:
-                            if fi['relative_path'].parent == dir_path:
-                                safe_link = str(fi['relative_path']).replace(os.sep, '_')
-                                f.write(f"- [[{safe_link}.md|{fi['relative_path'].name}]]\n")
-
-                        dirs_created.add(dir_path)
-                except Exception as e:
-                    print(f"Warning: Could not create README for {dir_path}: {e}")
+            by_dir[file_info['rel_dir']].append(file_info)
+
+        for dir_path, files in by_dir.items():
+            if not dir_path:  # Root files have no README stub
+                continue
+
+            readme_name = f"_DIR_{dir_path.replace(os.sep, '_')}_README.md"
+            readme_path = output_dir / readme_name
+
+            try:
+                with open(readme_path, 'w', encoding='utf-8', buffering=self._WRITE_BUFFER_SIZE) as f:
+                    f.write(f"# Directory: {dir_path}\n\n")
+                    f.write(f"This directory contains files from `{source_path / dir_path}`\n\n")
+                    f.write("## Files in this directory\n\n")
+
+                    for fi in files:
+                        safe_link = fi['relative_path'].replace(os.sep, '_')
+                        f.write(f"- [[{safe_link}.md|{fi['name']}]]\n")
+            except Exception as e:
+                print(f"Warning: Could not create README for {dir_path}: {e}")
 
 
 # Usage
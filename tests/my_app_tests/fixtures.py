@@ -0,0 +1,49 @@
+"""
+Synthetic inputs for the my_app tests, generated on demand so the repo does not carry
+megabytes of fixture data. The generators are seeded, so every run sees the same content.
+"""
+import os
+import random
+
+import orjson
+
+_RAW_CACHE_WORDS = ["alpha", "beta.", "gamma!", "delta?", "eps", "zeta", "x" * 50, "eta."]
+
+_TREE_DIRS = ["", "a", "a/b", "a/b/c", "Z", ".git/objects", "venv/lib", "pkg/__pycache__", "docs", "ünï"]
+_TREE_NAMES = ["x.py", "Y.PY", "conf.yml", "data.json", "Dockerfile", "Dockerfile.dev", "README.md",
+               "notes.md", "img.png", "s.sh", "w:eird?.py", "a.txt"]
+
+
+def make_raw_cache(path, pages=30, seed=1):
+    """Write a Stage 1 style raw cache (text_blocks only) with `pages` pages of random sentences."""
+    rng = random.Random(seed)
+    content = []
+    for page in range(pages):
+        blocks = [
+            " ".join(rng.choice(_RAW_CACHE_WORDS) for _ in range(rng.randint(0, 200)))
+            for _ in range(5)
+        ]
+        content.append({"page_number": page + 1, "text_blocks": blocks})
+    raw = {"metadata": {"title": "Test Book", "author": "A"}, "content": content}
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(raw))
+    return raw
+
+
+def make_exporter_tree(root, seed=3):
+    """
+    Build a source tree for code_exporter: nested and non-ASCII dirs, skip dirs (.git, venv,
+    __pycache__), names needing sanitizing, a CRLF file, a file over 1 MB and a symlinked dir.
+    """
+    rng = random.Random(seed)
+    for d in _TREE_DIRS:
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+    for d in _TREE_DIRS:
+        for name in rng.sample(_TREE_NAMES, 6):
+            with open(os.path.join(root, d, name), "w", encoding="utf-8") as f:
+                f.write(f"content {d}/{name}\n" + "línea\n" * rng.randint(0, 50))
+    with open(os.path.join(root, "docs", "crlf.py"), "wb") as f:
+        f.write(b"a\r\nb\rc\r\n" * 100)
+    with open(os.path.join(root, "big.py"), "wb") as f:
+        f.write(b"x" * (2 * 1024 * 1024))
+    os.symlink(os.path.join(root, "a"), os.path.join(root, "link"))
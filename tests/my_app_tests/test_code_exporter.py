@@ -0,0 +1,105 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from tests.my_app_tests.fixtures import make_exporter_tree
+
+_EXPORTER_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "scripts", "code_exporter.py")
+
+
+def _load_exporter_module():
+    spec = importlib.util.spec_from_file_location("code_exporter", _EXPORTER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+code_exporter = _load_exporter_module()
+
+
+class CodeExporterTest(unittest.TestCase):
+    """Runs the exporter over the synthetic tree from fixtures.make_exporter_tree."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.src = os.path.join(tmp.name, "src")
+        self.out = os.path.join(tmp.name, "out")
+        self.config_path = os.path.join(tmp.name, "export_config.json")
+        make_exporter_tree(self.src)
+
+    def _export(self, project):
+        # One project per run keeps export_all_projects out of its process pool
+        config = {
+            "export_base": self.out,
+            "projects": [dict(project, path=self.src)],
+            "global_include_patterns": ["*.py", "*.yml", "*.yaml", "*.json", "Dockerfile*", "*.md", "*.sh"],
+            "global_skip_dirs": ["__pycache__", ".git", "venv"],
+            "global_exclude_patterns": ["README.md"],
+            "max_file_size_mb": 1,
+        }
+        with open(self.config_path, "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            exporter = code_exporter.CodeProjectExporter(self.config_path)
+            exporter.timestamp = "TS"
+            results = exporter.export_all_projects()
+        self.assertTrue(results[0]["success"])
+        output_dir = os.path.join(self.out, f"{project['name']}_TS")
+        exported = {name for name in os.listdir(output_dir) if not name.startswith(("_DIR_", "00_"))}
+        return output_dir, exported
+
+    def _expected(self, keep):
+        expected = set()
+        for dirpath, dirnames, filenames in os.walk(self.src):
+            rel_dir = os.path.relpath(dirpath, self.src)
+            for name in filenames:
+                rel_path = name if rel_dir == "." else os.path.join(rel_dir, name)
+                if keep(rel_path, name):
+                    expected.add(rel_path.replace(os.sep, "_").replace(":", "_").replace("?", "_") + ".md")
+        return expected
+
+    def test_global_patterns(self):
+        skip = {"__pycache__", ".git", "venv"}
+        include = (".py", ".yml", ".json", ".md", ".sh")
+
+        def keep(rel_path, name):
+            return (not skip.intersection(rel_path.split(os.sep))
+                    and (name.lower().endswith(include) or name.startswith("Dockerfile"))
+                    and name != "README.md"
+                    and os.path.getsize(os.path.join(self.src, rel_path)) <= 1024 * 1024)
+
+        output_dir, exported = self._export({"name": "P1"})
+        self.assertEqual(exported, self._expected(keep))
+        self.assertNotIn("big.py.md", exported)
+        self.assertFalse(any(name.startswith("link_") for name in exported))  # Symlinked dir not followed
+        self.assertTrue(os.path.exists(os.path.join(output_dir, "00_PROJECT_INDEX.md")))
+
+    def test_project_overrides(self):
+        def keep(rel_path, name):
+            return (rel_path.split(os.sep)[0] != "a"
+                    and name.lower().endswith((".py", ".md"))
+                    and not name.startswith("notes")
+                    and os.path.getsize(os.path.join(self.src, rel_path)) <= 1024 * 1024)
+
+        _, exported = self._export({
+            "name": "P2", "include_patterns": ["*.py", "*.md"],
+            "exclude_patterns": ["notes*"], "skip_dirs": ["a"],
+        })
+        self.assertEqual(exported, self._expected(keep))
+        # Per-project skip_dirs replace the global ones rather than adding to them
+        self.assertTrue(any(name.startswith(".git_") for name in exported))
+
+    def test_crlf_file_is_normalized(self):
+        output_dir, exported = self._export({"name": "P1"})
+        self.assertIn("docs_crlf.py.md", exported)
+        with open(os.path.join(output_dir, "docs_crlf.py.md"), "rb") as f:
+            self.assertNotIn(b"\r", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
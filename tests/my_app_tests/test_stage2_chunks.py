@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from collections import defaultdict
+from pathlib import Path
+from unittest import mock
+
+import orjson
+
+from tests.my_app_tests.fixtures import make_raw_cache
+
+try:
+    from my_app.pdf_processor import process
+except (ImportError, OSError):  # pdf-service deps (fitz, fastapi, httpx, ...) or /workspace missing
+    process = None
+
+
+@unittest.skipIf(process is None, "pdf-service dependencies not available")
+class PrepareTTSChunksTest(unittest.TestCase):
+    """Stage 2 over the synthetic 30-page raw cache from fixtures.make_raw_cache."""
+
+    max_chars = 400
+
+    @classmethod
+    def setUpClass(cls):
+        tmp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp.cleanup)
+        cache_dir = Path(tmp.name)
+        raw_path = cache_dir / "Test_Book_raw.json"
+        cls.raw = make_raw_cache(raw_path)
+        with mock.patch.object(process, "CACHE_DIR", cache_dir):
+            citation_path = process.prepare_tts_chunks_with_citations(raw_path, max_chars=cls.max_chars)
+        with open(citation_path, "rb") as f:
+            cls.citation = orjson.loads(f.read())
+
+    def test_citation_file_name_and_book_id(self):
+        self.assertEqual(self.citation["book_id"], "Test_Book")
+        self.assertEqual(self.citation["metadata"], self.raw["metadata"])
+
+    def test_chunks_reassemble_blocks(self):
+        chunks = self.citation["chunks"]
+        self.assertEqual([c["chunk_id"] for c in chunks], list(range(len(chunks))))
+        self.assertEqual(self.citation["processing"]["total_chunks"], len(chunks))
+
+        by_block = defaultdict(list)
+        for chunk in chunks:
+            self.assertEqual(chunk["text"], " ".join(s["text"] for s in chunk["sentences"]))
+            self.assertTrue(len(chunk["text"]) < self.max_chars or len(chunk["sentences"]) == 1)
+            by_block[(chunk["page"], chunk["block_index"])].append(chunk["text"])
+
+        expected = {
+            (page["page_number"], i + 1): text
+            for page in self.raw["content"] for i, text in enumerate(page["text_blocks"]) if text
+        }
+        self.assertEqual({key: " ".join(texts) for key, texts in by_block.items()}, expected)
+
+    def test_sentence_indices(self):
+        sentences = [s for chunk in self.citation["chunks"] for s in chunk["sentences"]]
+        self.assertEqual([s["global_index"] for s in sentences], list(range(len(sentences))))
+        self.assertEqual(self.citation["processing"]["total_sentences"], len(sentences))
+        for chunk in self.citation["chunks"]:
+            self.assertEqual([s["sentence_in_block"] for s in chunk["sentences"]], list(range(len(chunk["sentences"]))))
+
+    def test_timeline_is_contiguous(self):
+        start = 0.0
+        for chunk in self.citation["chunks"]:
+            self.assertEqual(chunk["start_time"], start)
+            self.assertEqual(chunk["duration_seconds"], len(chunk["text"]) / 14)
+            self.assertEqual(chunk["end_time"], chunk["start_time"] + chunk["duration_seconds"])
+            start = chunk["end_time"]
+        self.assertEqual(self.citation["processing"]["total_estimated_duration_seconds"], start)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+import wave
+from pathlib import Path
+from unittest import mock
+
+try:
+    from my_app.pdf_processor import process
+except (ImportError, OSError):  # pdf-service deps (fitz, fastapi, httpx, ...) or /workspace missing
+    process = None
+
+
+def _chunk(chunk_id, page, n_chars):
+    return {"chunk_id": chunk_id, "page": page, "text": "x" * n_chars}
+
+
+def _ids(groups):
+    return [[c["chunk_id"] for c in group] for group in groups]
+
+
+@unittest.skipIf(process is None, "pdf-service dependencies not available")
+class GroupChunksForTTSTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(
+            process, TTS_BATCH_SHORT_CHUNKS=True, TTS_BATCH_MAX_CHARS=350, TTS_BATCH_MAX_CHUNKS=4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_disabled_keeps_one_chunk_per_group(self):
+        chunks = [_chunk(i, 1, 10) for i in range(3)]
+        with mock.patch.object(process, "TTS_BATCH_SHORT_CHUNKS", False):
+            self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0], [1], [2]])
+
+    def test_page_change_starts_new_group(self):
+        chunks = [_chunk(0, 1, 10), _chunk(1, 1, 10), _chunk(2, 2, 10), _chunk(3, 2, 10)]
+        self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0, 1], [2, 3]])
+
+    def test_non_consecutive_ids_are_not_grouped(self):
+        chunks = [_chunk(0, 1, 10), _chunk(2, 1, 10)]
+        self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0], [2]])
+
+    def test_char_limit(self):
+        # Each chunk counts len(text) + 1 for the joining space: 3 * 117 = 351 is over the limit,
+        # 3 * 116 = 348 is under it
+        chunks = [_chunk(i, 1, 116) for i in range(4)]
+        self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0, 1], [2, 3]])
+        chunks = [_chunk(i, 1, 115) for i in range(4)]
+        self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0, 1, 2], [3]])
+
+    def test_oversized_chunk_is_its_own_group(self):
+        chunks = [_chunk(0, 1, 400), _chunk(1, 1, 10), _chunk(2, 1, 10)]
+        self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0], [1, 2]])
+
+    def test_count_limit(self):
+        chunks = [_chunk(i, 1, 5) for i in range(10)]
+        self.assertEqual(_ids(process._group_chunks_for_tts(chunks)), [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+
+@unittest.skipIf(process is None, "pdf-service dependencies not available")
+class SplitBatchedWavTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def _write_batch(self, n_frames, sampwidth=2, channels=1):
+        path = self.dir / "batch.wav.batch.part"
+        with wave.open(str(path), "wb") as f:
+            f.setnchannels(channels)
+            f.setsampwidth(sampwidth)
+            f.setframerate(22050)
+            f.writeframes(bytes(i % 256 for i in range(n_frames * sampwidth * channels)))
+        with wave.open(str(path), "rb") as f:
+            return path, f.readframes(n_frames)
+
+    def _split(self, n_frames, weights, channels=1):
+        batch_path, frames = self._write_batch(n_frames, channels=channels)
+        out_paths = [self.dir / f"chunk_{i}.wav" for i in range(len(weights))]
+        process._split_batched_wav(batch_path, out_paths, weights)
+        self.assertFalse(batch_path.exists())
+        self.assertEqual(sorted(os.listdir(self.dir)), sorted(p.name for p in out_paths))
+        counts, data = [], b""
+        for path in out_paths:
+            with wave.open(str(path), "rb") as f:
+                self.assertEqual(f.getnchannels(), channels)
+                counts.append(f.getnframes())
+                data += f.readframes(f.getnframes())
+        return counts, data, frames
+
+    def test_frame_counts_sum_to_total(self):
+        counts, data, frames = self._split(10007, [120, 45, 300, 7])
+        self.assertEqual(sum(counts), 10007)
+        self.assertEqual(data, frames)
+
+    def test_counts_follow_weights_and_last_takes_remainder(self):
+        # 1000 * 1/3 and 1000 * 2/3 round to 333 and 667; the last output gets everything left
+        counts, _, _ = self._split(1000, [1, 1, 1])
+        self.assertEqual(counts, [333, 334, 333])
+        counts, _, _ = self._split(1001, [1, 1, 1])
+        self.assertEqual(counts, [334, 333, 334])
+
+    def test_zero_weights_put_everything_in_last_chunk(self):
+        counts, _, _ = self._split(500, [0, 0], channels=2)
+        self.assertEqual(counts, [0, 500])
+
+
+if __name__ == "__main__":
+    unittest.main()